@@ -0,0 +1,37 @@
+from typing import List
+
+from ..azure.openai_client import create_chat_completion
+from ..config import get_settings
+from ..langgraph.state import ConversationTurn
+from ..utils.tokens import truncate_tokens
+
+_settings = get_settings()
+
+
+SYSTEM_PROMPT = """You maintain a running summary of a conversation between an employee and an HR assistant.
+
+Given the current summary and the turns to fold into it, return an updated summary that:
+- keeps the employee's situation (e.g. contract type, location, role) and what they asked
+- keeps the key facts and policies the assistant gave, with document names where mentioned
+- drops greetings and repetition
+Return ONLY the summary text, at most a short paragraph.
+"""
+
+
+def format_turns(turns: List[ConversationTurn]) -> str:
+    return "\n".join(f"{t['role'].capitalize()}: {t['content']}" for t in turns)
+
+
+def summarize_history(summary: str, turns: List[ConversationTurn]) -> str:
+    if not turns:
+        return summary
+
+    user_content = (
+        f"Current summary:\n{summary or '(empty)'}\n\n"
+        f"Turns to fold in:\n{format_turns(turns)}"
+    )
+    msg = [{"role": "user", "content": user_content}]
+    new_summary = create_chat_completion(
+        SYSTEM_PROMPT, msg, max_tokens=_settings.CONVERSATION_SUMMARY_MAX_TOKENS
+    )
+    return truncate_tokens(new_summary.strip(), _settings.CONVERSATION_SUMMARY_MAX_TOKENS)
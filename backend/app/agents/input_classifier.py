@@ -1,8 +1,11 @@
+import json
 from typing import Dict
-from ..azure.openai_client import create_chat_completion
+from ..azure.openai_client import create_chat_completion_with_usage
 from ..langgraph.state import HRState
 
 
+# Static instructions first, the question alone in the last message, so every
+# classification shares the same cached prefix.
 SYSTEM_PROMPT = """You are an HR query classifier.
 
 Given a user question, you MUST:
@@ -15,11 +18,11 @@ Return ONLY valid JSON, nothing else.
 
 
 def classify_intent(state: HRState) -> HRState:
-    question = state["question"]
+    # The standalone rewrite carries the topic of follow-ups like "and for part-timers?"
+    question = state.get("search_query") or state["question"]
     msg = [{"role": "user", "content": question}]
 
-    import json
-    raw = create_chat_completion(SYSTEM_PROMPT, msg, max_tokens=200)
+    raw, usage = create_chat_completion_with_usage(SYSTEM_PROMPT, msg, max_tokens=200)
 
     topic = "generic"
     intent = "generic"
@@ -35,5 +38,6 @@ def classify_intent(state: HRState) -> HRState:
     state["intent"] = intent
     state.setdefault("debug_info", {})
     state["debug_info"]["classifier_raw"] = raw
+    state["debug_info"]["classifier_usage"] = usage
 
     return state
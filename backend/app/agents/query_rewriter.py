@@ -0,0 +1,37 @@
+from ..azure.openai_client import create_chat_completion
+from ..langgraph.state import HRState
+from .history_summarizer import format_turns
+
+
+SYSTEM_PROMPT = """You rewrite follow-up questions for an HR policy search engine.
+
+Given the conversation so far and the employee's latest question, return one standalone
+question that includes every detail from the conversation needed to search HR policies
+(e.g. "and for part-timers?" -> "How many days of paid leave do part-time employees get?").
+If the latest question is already standalone, return it unchanged.
+Return ONLY the question, nothing else.
+"""
+
+
+def rewrite_query(state: HRState) -> HRState:
+    question = state["question"]
+    history = state.get("history") or []
+    summary = state.get("history_summary") or ""
+
+    search_query = question
+    if history or summary:
+        user_content = (
+            f"Conversation summary:\n{summary or '(none)'}\n\n"
+            f"Recent turns:\n{format_turns(history) or '(none)'}\n\n"
+            f"Latest question:\n{question}"
+        )
+        msg = [{"role": "user", "content": user_content}]
+        try:
+            search_query = create_chat_completion(SYSTEM_PROMPT, msg, max_tokens=150).strip() or question
+        except Exception:
+            search_query = question
+
+    state["search_query"] = search_query
+    state.setdefault("debug_info", {})
+    state["debug_info"]["search_query"] = search_query
+    return state
@@ -1,8 +1,17 @@
 from typing import List
 from ..langgraph.state import HRState, RetrievedChunk
-from ..azure.openai_client import create_chat_completion
+from ..azure.openai_client import create_chat_completion_with_usage
+from ..config import get_settings
+from ..utils.tokens import count_tokens
 
+_settings = get_settings()
 
+
+# Prompt layout, most stable first: system rules -> conversation summary ->
+# earlier turns -> policy context -> question. The system prompt alone is far
+# below the provider's 1024-token minimum for prompt caching, so cache hits only
+# come from later turns of a long conversation, whose summary and earlier turns
+# repeat as the prefix.
 SYSTEM_PROMPT = """You are an internal HR assistant for a company.
 
 Rules:
@@ -10,12 +19,20 @@ Rules:
 - If the answer is not in the context, say you don't know and recommend contacting HR.
 - Cite your sources with (Document, page X) where possible.
 - Be concise, clear, and professional.
+
+The last user message contains the HR policy context followed by the question.
 """
 
 
 def _format_context(chunks: List[RetrievedChunk]) -> str:
+    # Sorted by document and page so the same chunks always render identically,
+    # whatever their ranking.
+    ordered = sorted(
+        chunks,
+        key=lambda c: (c.get("source") or "", c.get("page") or 0, c.get("content") or ""),
+    )
     lines = []
-    for i, c in enumerate(chunks):
+    for i, c in enumerate(ordered):
         src = c.get("source", "unknown")
         page = c.get("page")
         lines.append(
@@ -24,20 +41,45 @@ def _format_context(chunks: List[RetrievedChunk]) -> str:
     return "\n\n".join(lines)
 
 
+def _select_context(chunks: List[RetrievedChunk], max_tokens: int) -> List[RetrievedChunk]:
+    """Chunks in ranking order until the context token budget is used up."""
+
+    selected = []
+    used = 0
+    for c in chunks:
+        used += count_tokens(c.get("content", "")) + 20  # source/page header
+        if used > max_tokens and selected:
+            break
+        selected.append(c)
+    return selected
+
+
+def _system_prompt(state: HRState) -> str:
+    summary = state.get("history_summary")
+    if not summary:
+        return SYSTEM_PROMPT
+    return f"{SYSTEM_PROMPT}\nSummary of the earlier conversation:\n{summary}\n"
+
+
 def generate_answer(state: HRState) -> HRState:
     question = state["question"]
-    chunks = state.get("retrieved_chunks", [])
+    chunks = _select_context(
+        state.get("retrieved_chunks", []), _settings.CONTEXT_TOKEN_BUDGET
+    )
 
     context_text = _format_context(chunks)
 
-    user_content = f"Question:\n{question}\n\nHR Policy Context:\n{context_text}"
+    user_content = f"HR Policy Context:\n{context_text}\n\nQuestion:\n{question}"
 
-    msg = [{"role": "user", "content": user_content}]
-    answer = create_chat_completion(SYSTEM_PROMPT, msg, max_tokens=800)
+    history = [{"role": t["role"], "content": t["content"]} for t in state.get("history", [])]
+    msg = [*history, {"role": "user", "content": user_content}]
+    answer, usage = create_chat_completion_with_usage(_system_prompt(state), msg, max_tokens=800)
 
-    # Simple citation mapping: use all chunks as citations for now
+    # Simple citation mapping: use all chunks sent as context for now, in
+    # ranking order (the first ones are reused by the next conversation turn)
     state["answer"] = answer
     state["citations"] = chunks
     state.setdefault("debug_info", {})
     state["debug_info"]["used_context_len"] = len(chunks)
+    state["debug_info"]["answer_usage"] = usage
     return state
@@ -1,5 +1,8 @@
 from ..langgraph.state import HRState
 from ..azure.search_client import search_hr_documents
+from ..config import get_settings
+
+_settings = get_settings()
 
 
 def build_filter_from_topic(topic: str | None) -> str | None:
@@ -9,7 +12,7 @@ def build_filter_from_topic(topic: str | None) -> str | None:
 
 
 def retrieve_documents(state: HRState) -> HRState:
-    question = state["question"]
+    question = state.get("search_query") or state["question"]
     topic = state.get("topic")
 
     # Use no filter for now since we don't have topic field
@@ -23,7 +26,19 @@ def retrieve_documents(state: HRState) -> HRState:
             "page": d.get("page"),
         })
 
+    # Follow-ups usually build on the previous answer, so its chunks stay
+    # available after the fresh results.
+    seen = {(c["source"], c["page"], c["content"]) for c in chunks}
+    reused = 0
+    for c in state.get("previous_chunks", [])[: _settings.CONVERSATION_REUSED_CHUNKS]:
+        key = (c.get("source", "unknown"), c.get("page"), c.get("content"))
+        if key not in seen:
+            seen.add(key)
+            chunks.append(c)
+            reused += 1
+
     state["retrieved_chunks"] = chunks
     state.setdefault("debug_info", {})
     state["debug_info"]["retrieved_count"] = len(chunks)
+    state["debug_info"]["reused_chunks"] = reused
     return state
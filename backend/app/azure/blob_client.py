@@ -1,11 +1,15 @@
-import uuid
-from typing import Optional
+import json
+import re
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
 
-from azure.core.exceptions import ResourceExistsError
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
 from azure.storage.blob import BlobServiceClient, ContentSettings
 from loguru import logger
 
 from ..config import get_settings
+from ..utils.profiling import span
 
 _settings = get_settings()
 
@@ -58,23 +62,170 @@ def _ensure_container_client():
     return _container_client
 
 
-def upload_pdf_to_blob(filename: str, data: bytes) -> Optional[str]:
-    """Upload PDF bytes to blob storage if configured. Returns blob URL or None."""
+def upload_pdf_to_blob(
+    filename: str, data: bytes, content_hash: str
+) -> Tuple[Optional[str], bool]:
+    """Store PDF bytes under their content hash if blob storage is configured.
+
+    Returns (blob URL or None, True if an identical PDF was already stored).
+    """
 
     container_client = _ensure_container_client()
     if container_client is None:
-        return None
+        return None, False
 
-    blob_name = f"{uuid.uuid4()}-{filename}"
+    blob_name = f"{content_hash}.pdf"
     blob_client = container_client.get_blob_client(blob=blob_name)
 
     try:
-        blob_client.upload_blob(
-            data,
+        with span("blob.upload_pdf"):
+            if blob_client.exists():
+                logger.info(f"Blob {blob_name} already stored, skipping upload of {filename}")
+                return blob_client.url, True
+
+            blob_client.upload_blob(
+                data,
+                overwrite=True,
+                content_settings=ContentSettings(content_type="application/pdf"),
+                # Metadata values must be ASCII.
+                metadata={"filename": quote(filename)},
+            )
+        return blob_client.url, False
+    except Exception as exc:
+        logger.error(f"Failed to upload blob {blob_name}: {exc}")
+        return None, False
+
+
+def download_json_from_blob(blob_name: str) -> Optional[dict]:
+    """Return a JSON blob as a dict, or None if missing or storage is not configured."""
+
+    container_client = _ensure_container_client()
+    if container_client is None:
+        return None
+
+    try:
+        data = container_client.get_blob_client(blob=blob_name).download_blob().readall()
+        return json.loads(data)
+    except ResourceNotFoundError:
+        return None
+    except Exception as exc:
+        logger.error(f"Failed to download blob {blob_name}: {exc}")
+        return None
+
+
+def upload_json_to_blob(blob_name: str, payload: dict) -> bool:
+    container_client = _ensure_container_client()
+    if container_client is None:
+        return False
+
+    try:
+        container_client.get_blob_client(blob=blob_name).upload_blob(
+            json.dumps(payload).encode("utf-8"),
             overwrite=True,
-            content_settings=ContentSettings(content_type="application/pdf"),
+            content_settings=ContentSettings(content_type="application/json"),
         )
-        return blob_client.url
+        return True
     except Exception as exc:
         logger.error(f"Failed to upload blob {blob_name}: {exc}")
-        return None
+        return False
+
+
+def blob_storage_enabled() -> bool:
+    return _ensure_container_client() is not None
+
+
+def download_json_with_etag(blob_name: str) -> Tuple[Optional[dict], Optional[str]]:
+    """Return (payload, etag), or (None, None) if the blob does not exist.
+
+    Raises if storage is not configured or the download fails.
+    """
+
+    container_client = _ensure_container_client()
+    if container_client is None:
+        raise RuntimeError("Azure Blob storage is not configured.")
+
+    try:
+        downloader = container_client.get_blob_client(blob=blob_name).download_blob()
+    except ResourceNotFoundError:
+        return None, None
+    return json.loads(downloader.readall()), downloader.properties.etag
+
+
+def upload_json_if_match(blob_name: str, payload: dict, etag: Optional[str]) -> bool:
+    """
+    Write payload only if the blob still has etag (or, with etag None, does not
+    exist yet). Returns False when another writer got there first.
+    """
+
+    container_client = _ensure_container_client()
+    if container_client is None:
+        raise RuntimeError("Azure Blob storage is not configured.")
+
+    data = json.dumps(payload).encode("utf-8")
+    content_settings = ContentSettings(content_type="application/json")
+    blob_client = container_client.get_blob_client(blob=blob_name)
+    try:
+        if etag is None:
+            blob_client.upload_blob(data, overwrite=False, content_settings=content_settings)
+        else:
+            blob_client.upload_blob(
+                data,
+                overwrite=True,
+                content_settings=content_settings,
+                etag=etag,
+                match_condition=MatchConditions.IfNotModified,
+            )
+        return True
+    except (ResourceExistsError, ResourceModifiedError):
+        return False
+
+
+def list_blob_names_newest_first(prefix: str) -> List[str]:
+    """Names of the blobs under prefix, most recently modified first."""
+
+    container_client = _ensure_container_client()
+    if container_client is None:
+        raise RuntimeError("Azure Blob storage is not configured.")
+    blobs = sorted(
+        container_client.list_blobs(name_starts_with=prefix),
+        key=lambda blob: blob.last_modified,
+        reverse=True,
+    )
+    return [blob.name for blob in blobs]
+
+
+def delete_blob(blob_name: str) -> None:
+    container_client = _ensure_container_client()
+    if container_client is None:
+        raise RuntimeError("Azure Blob storage is not configured.")
+    try:
+        container_client.get_blob_client(blob=blob_name).delete_blob()
+    except ResourceNotFoundError:
+        pass
+
+
+# Blobs uploaded before content-hash naming: "{uuid4}-{filename}", no metadata.
+_LEGACY_BLOB_PREFIX = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}-")
+
+
+def list_pdf_blobs() -> Iterator[Tuple[str, str]]:
+    """Yields (blob_name, original filename) for every stored PDF."""
+
+    container_client = _ensure_container_client()
+    if container_client is None:
+        return
+
+    for blob in container_client.list_blobs(include=["metadata"]):
+        if "/" in blob.name or not blob.name.endswith(".pdf"):
+            continue
+        filename = unquote((blob.metadata or {}).get("filename", "")) or _LEGACY_BLOB_PREFIX.sub(
+            "", blob.name
+        )
+        yield blob.name, filename
+
+
+def download_blob_bytes(blob_name: str) -> bytes:
+    container_client = _ensure_container_client()
+    if container_client is None:
+        raise RuntimeError("Azure Blob storage is not configured.")
+    return container_client.get_blob_client(blob=blob_name).download_blob().readall()
@@ -1,10 +1,18 @@
-from typing import List, Dict, Optional
+import asyncio
+import contextvars
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
 
+import pypdf
 from azure.ai.formrecognizer import DocumentAnalysisClient
+from azure.ai.formrecognizer.aio import DocumentAnalysisClient as AsyncDocumentAnalysisClient
 from azure.core.credentials import AzureKeyCredential
 from loguru import logger
 
 from ..config import get_settings
+from ..utils.profiling import span
 
 _settings = get_settings()
 
@@ -25,6 +33,13 @@ def _create_client() -> Optional[DocumentAnalysisClient]:
         return None
 
 
+def _configured() -> bool:
+    if not _settings.AZURE_FORMRECOG_ENDPOINT or not _settings.AZURE_FORMRECOG_API_KEY:
+        logger.debug("Azure Document Intelligence credentials not configured.")
+        return False
+    return True
+
+
 def get_document_analysis_client() -> Optional[DocumentAnalysisClient]:
     global _client
     if _client is None:
@@ -32,25 +47,7 @@ def get_document_analysis_client() -> Optional[DocumentAnalysisClient]:
     return _client
 
 
-def extract_pages_via_document_intelligence(pdf_bytes: bytes) -> List[Dict]:
-    """Return [{"page": int, "text": str}] using Azure Document Intelligence."""
-
-    client = get_document_analysis_client()
-    if client is None:
-        return []
-
-    try:
-        logger.info(f"Starting Document Intelligence analysis for {len(pdf_bytes)} bytes")
-        poller = client.begin_analyze_document(
-            model_id="prebuilt-read",
-            document=pdf_bytes,
-        )
-        result = poller.result()
-        logger.info(f"Document Intelligence analysis completed. Found {len(result.pages or [])} pages")
-    except Exception as exc:
-        logger.error(f"Document Intelligence extraction failed: {exc}")
-        return []
-
+def _pages_from_result(result) -> List[Dict]:
     pages: List[Dict] = []
     for page in result.pages or []:
         lines = []
@@ -64,5 +61,123 @@ def extract_pages_via_document_intelligence(pdf_bytes: bytes) -> List[Dict]:
                 "page": page.page_number,
                 "text": page_text,
             })
-
     return pages
+
+
+async def _analyze_async(pdf_bytes: bytes) -> List[Dict]:
+    async with AsyncDocumentAnalysisClient(
+        endpoint=_settings.AZURE_FORMRECOG_ENDPOINT,
+        credential=AzureKeyCredential(_settings.AZURE_FORMRECOG_API_KEY),
+    ) as client:
+        poller = await client.begin_analyze_document(model_id="prebuilt-read", document=pdf_bytes)
+        return _pages_from_result(await poller.result())
+
+
+def _analyze(pdf_bytes: bytes, timeout: float) -> List[Dict]:
+    """Analyze a whole PDF; raises on failure or timeout."""
+
+    # A sync poller keeps polling on its own thread after wait() times out.
+    # With the aio client, wait_for cancels the upload or the polling and
+    # closes the client, so a timed-out analysis leaves nothing running here.
+    # Each call runs its own event loop, so it is safe from worker threads.
+    with span("docintel.analyze"):
+        try:
+            return asyncio.run(asyncio.wait_for(_analyze_async(pdf_bytes), timeout))
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Document Intelligence analysis timed out after {timeout}s")
+
+
+def extract_pages_via_document_intelligence(
+    pdf_bytes: bytes,
+    timeout: Optional[float] = None,
+) -> List[Dict]:
+    """Return [{"page": int, "text": str}] using Azure Document Intelligence."""
+
+    if not _configured():
+        return []
+
+    try:
+        logger.info(f"Starting Document Intelligence analysis for {len(pdf_bytes)} bytes")
+        pages = _analyze(pdf_bytes, timeout or _settings.DOCINTEL_TIMEOUT_SECONDS)
+        logger.info(f"Document Intelligence analysis completed. Found {len(pages)} pages")
+        return pages
+    except Exception as exc:
+        logger.error(f"Document Intelligence extraction failed: {exc}")
+        return []
+
+
+def _cut_pages(reader: pypdf.PdfReader, start: int, end: int) -> bytes:
+    """A new PDF holding pages start..end (1-based, inclusive) of reader."""
+
+    writer = pypdf.PdfWriter()
+    for index in range(start - 1, end):
+        writer.add_page(reader.pages[index])
+    out = BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def _analyze_range(part: bytes, page_range: Tuple[int, int]) -> Optional[List[Dict]]:
+    start, end = page_range
+    try:
+        pages = _analyze(part, _settings.DOCINTEL_TIMEOUT_SECONDS)
+    except Exception as exc:
+        logger.error(f"Document Intelligence failed for pages {start}-{end}: {exc}")
+        return None
+    # Page numbers are relative to the cut PDF; map them back to the original.
+    return [{**page, "page": start + page["page"] - 1} for page in pages]
+
+
+def iter_page_ranges_via_document_intelligence(
+    pdf_bytes: bytes,
+    page_ranges: List[Tuple[int, int]],
+) -> Iterator[Tuple[Tuple[int, int], Optional[List[Dict]]]]:
+    """
+    Analyze inclusive page ranges concurrently, yielding (page_range, pages) in
+    range order as soon as each range is done. pages is None when the range
+    failed or timed out (or Document Intelligence is not configured).
+
+    Each range is cut into its own small PDF, so only those pages are uploaded.
+    At most DOCINTEL_MAX_CONCURRENCY analyses run at once.
+    """
+
+    if not page_ranges:
+        return
+    if not _configured():
+        for page_range in page_ranges:
+            yield page_range, None
+        return
+
+    reader = pypdf.PdfReader(BytesIO(pdf_bytes))
+    remaining = iter(page_ranges)
+    max_workers = max(1, min(_settings.DOCINTEL_MAX_CONCURRENCY, len(page_ranges)))
+    pending: Deque = deque()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="docintel") as pool:
+
+        def submit_next() -> None:
+            page_range = next(remaining, None)
+            if page_range is None:
+                return
+            # PdfReader is not thread-safe, so ranges are cut here, one ahead
+            # of each free slot.
+            try:
+                with span("docintel.cut_pages"):
+                    part = _cut_pages(reader, *page_range)
+            except Exception as exc:
+                logger.error(f"Could not cut pages {page_range[0]}-{page_range[1]} for OCR: {exc}")
+                future: Future = Future()
+                future.set_result(None)
+            else:
+                future = pool.submit(
+                    contextvars.copy_context().run, _analyze_range, part, page_range
+                )
+            pending.append((page_range, future))
+
+        for _ in range(max_workers):
+            submit_next()
+        while pending:
+            page_range, future = pending.popleft()
+            pages = future.result()
+            submit_next()
+            yield page_range, pages
@@ -0,0 +1,141 @@
+from typing import Dict, Optional
+
+from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import ResourceNotFoundError
+from azure.search.documents.indexes import SearchIndexClient
+from azure.search.documents.indexes.models import (
+    HnswAlgorithmConfiguration,
+    ScalarQuantizationCompression,
+    ScalarQuantizationParameters,
+    SearchAlias,
+    SearchableField,
+    SearchField,
+    SearchFieldDataType,
+    SearchIndex,
+    SimpleField,
+    VectorSearch,
+    VectorSearchProfile,
+)
+from loguru import logger
+
+from ..config import get_settings
+from .blob_client import blob_storage_enabled, download_json_with_etag, upload_json_to_blob
+
+_settings = get_settings()
+
+_index_client: Optional[SearchIndexClient] = None
+
+QUANTIZATIONS = ("none", "int8")
+
+
+def get_index_client() -> SearchIndexClient:
+    global _index_client
+    if _index_client is None:
+        _index_client = SearchIndexClient(
+            endpoint=_settings.AZURE_SEARCH_ENDPOINT,
+            credential=AzureKeyCredential(_settings.AZURE_SEARCH_API_KEY),
+        )
+    return _index_client
+
+
+def build_index(name: str, dimensions: int, quantization: str = "none") -> SearchIndex:
+    """HR chunk index: id, content, source, page and the embedding vector."""
+
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization {quantization!r}, expected one of {QUANTIZATIONS}")
+
+    compressions = []
+    if quantization == "int8":
+        compressions.append(
+            ScalarQuantizationCompression(
+                compression_name="int8-scalar",
+                parameters=ScalarQuantizationParameters(quantized_data_type="int8"),
+            )
+        )
+    profile = VectorSearchProfile(
+        name="hr-vector-profile",
+        algorithm_configuration_name="hnsw",
+        compression_name=compressions[0].compression_name if compressions else None,
+    )
+
+    fields = [
+        SimpleField(name="id", type=SearchFieldDataType.String, key=True),
+        SearchableField(name="content"),
+        SimpleField(name="source", type=SearchFieldDataType.String, filterable=True),
+        SimpleField(name="page", type=SearchFieldDataType.Int32, filterable=True),
+        # Vectors are never read back (reindexing re-embeds from blobs), so
+        # no retrievable copy is stored.
+        SearchField(
+            name="embedding",
+            type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
+            searchable=True,
+            retrievable=False,
+            stored=False,
+            vector_search_dimensions=dimensions,
+            vector_search_profile_name=profile.name,
+        ),
+    ]
+
+    return SearchIndex(
+        name=name,
+        fields=fields,
+        vector_search=VectorSearch(
+            algorithms=[HnswAlgorithmConfiguration(name="hnsw")],
+            profiles=[profile],
+            compressions=compressions,
+        ),
+    )
+
+
+def create_index(name: str, dimensions: int, quantization: str = "none") -> SearchIndex:
+    logger.info(f"Creating search index {name} ({dimensions} dims, quantization={quantization})")
+    return get_index_client().create_index(build_index(name, dimensions, quantization))
+
+
+def index_exists(name: str) -> bool:
+    try:
+        get_index_client().get_index(name)
+        return True
+    except ResourceNotFoundError:
+        return False
+
+
+def _embedding_config_blob(index_name: str) -> str:
+    return f"search-indexes/{index_name}.json"
+
+
+def write_index_embedding_config(index_name: str, model: str, dimensions: Optional[int]) -> bool:
+    """Record the embedding model an index was filled with, next to the stored PDFs."""
+
+    return upload_json_to_blob(
+        _embedding_config_blob(index_name), {"model": model, "dimensions": dimensions}
+    )
+
+
+def read_index_embedding_config(index_name: str) -> Optional[Dict]:
+    """
+    {"model", "dimensions"} recorded for index_name, or None when none was
+    recorded (indexes created before, or no blob storage). Raises if the
+    lookup itself fails, so callers never mistake an outage for "not recorded".
+    """
+
+    if not blob_storage_enabled():
+        return None
+    config, _ = download_json_with_etag(_embedding_config_blob(index_name))
+    return config
+
+
+def get_alias_target(alias: str) -> Optional[str]:
+    try:
+        indexes = get_index_client().get_alias(alias).indexes
+    except ResourceNotFoundError:
+        return None
+    return indexes[0] if indexes else None
+
+
+def swap_alias(alias: str, index_name: str) -> None:
+    """Point alias at index_name; queries through the alias switch atomically."""
+
+    previous = get_alias_target(alias)
+    get_index_client().create_or_update_alias(SearchAlias(name=alias, indexes=[index_name]))
+    logger.info(f"Search alias {alias}: {previous} -> {index_name}")
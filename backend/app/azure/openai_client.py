@@ -1,32 +1,148 @@
-from typing import List
+import hashlib
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
 from openai import OpenAI
 from ..config import get_settings
+from ..utils.cache import LRUCache
+from ..utils.hedging import Hedger
+from ..utils.profiling import span
 
 _settings = get_settings()
 
 # Use standard OpenAI API
 _client = OpenAI(api_key=_settings.OPENAI_API_KEY)
 
+_embedding_hedger = Hedger("embeddings")
+
+# Exact-repeat answers keyed by a hash of the full prompt.
+_response_cache = LRUCache(
+    max_entries=_settings.LLM_RESPONSE_CACHE_SIZE,
+    ttl_seconds=_settings.LLM_RESPONSE_CACHE_TTL_SECONDS,
+)
+
+_usage_lock = threading.Lock()
+_usage_totals = {
+    "calls": 0,
+    "response_cache_hits": 0,
+    "prompt_tokens": 0,
+    "cached_prompt_tokens": 0,
+    "completion_tokens": 0,
+}
+
 
 def get_openai_client() -> OpenAI:
     return _client
 
 
-def create_chat_completion(system_prompt: str, messages: List[dict], max_tokens: int = 800) -> str:
-    client = get_openai_client()
-    resp = client.chat.completions.create(
-        model=_settings.OPENAI_CHAT_MODEL,
-        max_tokens=max_tokens,
-        temperature=0.2,
-        messages=[{"role": "system", "content": system_prompt}, *messages],
+def _prompt_hash(model: str, max_tokens: int, temperature: float, messages: List[dict]) -> str:
+    payload = json.dumps(
+        {"model": model, "max_tokens": max_tokens, "temperature": temperature, "messages": messages},
+        sort_keys=True,
+        ensure_ascii=False,
     )
-    return resp.choices[0].message.content
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
-def create_embeddings(texts: List[str]) -> List[List[float]]:
-    client = get_openai_client()
-    resp = client.embeddings.create(
-        model=_settings.OPENAI_EMBEDDING_MODEL,
-        input=texts,
+def _record_usage(usage: Dict) -> None:
+    with _usage_lock:
+        _usage_totals["calls"] += 1
+        for key in ("prompt_tokens", "cached_prompt_tokens", "completion_tokens"):
+            _usage_totals[key] += usage[key]
+        if usage["response_cache_hit"]:
+            _usage_totals["response_cache_hits"] += 1
+
+
+def llm_usage_stats() -> Dict:
+    with _usage_lock:
+        stats = dict(_usage_totals)
+    stats["cached_prompt_ratio"] = (
+        round(stats["cached_prompt_tokens"] / stats["prompt_tokens"], 4)
+        if stats["prompt_tokens"]
+        else 0.0
     )
+    stats["response_cache_entries"] = len(_response_cache)
+    return stats
+
+
+def create_chat_completion_with_usage(
+    system_prompt: str, messages: List[dict], max_tokens: int = 800
+) -> Tuple[str, Dict]:
+    """
+    Returns (content, usage). usage has prompt, provider-cached prompt and
+    completion token counts, and whether the local response cache answered.
+    Keep the start of system_prompt/messages stable across calls so the
+    provider's prefix cache can reuse it.
+    """
+
+    full_messages = [{"role": "system", "content": system_prompt}, *messages]
+    temperature = 0.2
+    key = _prompt_hash(_settings.OPENAI_CHAT_MODEL, max_tokens, temperature, full_messages)
+
+    cached = _response_cache.get(key)
+    if cached is not None:
+        usage = {
+            "prompt_tokens": 0,
+            "cached_prompt_tokens": 0,
+            "completion_tokens": 0,
+            "response_cache_hit": True,
+        }
+        _record_usage(usage)
+        return cached, usage
+
+    client = get_openai_client()
+    with span("openai.chat"):
+        resp = client.chat.completions.create(
+            model=_settings.OPENAI_CHAT_MODEL,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=full_messages,
+        )
+    content = resp.choices[0].message.content
+
+    details = getattr(resp.usage, "prompt_tokens_details", None)
+    usage = {
+        "prompt_tokens": getattr(resp.usage, "prompt_tokens", 0) or 0,
+        "cached_prompt_tokens": getattr(details, "cached_tokens", 0) or 0,
+        "completion_tokens": getattr(resp.usage, "completion_tokens", 0) or 0,
+        "response_cache_hit": False,
+    }
+    _record_usage(usage)
+
+    if content:
+        _response_cache.set(key, content)
+    return content, usage
+
+
+def create_chat_completion(system_prompt: str, messages: List[dict], max_tokens: int = 800) -> str:
+    return create_chat_completion_with_usage(system_prompt, messages, max_tokens)[0]
+
+
+def _create_embeddings(
+    texts: List[str], model: Optional[str], dimensions: Optional[int]
+) -> List[List[float]]:
+    client = get_openai_client()
+    kwargs = {}
+    if dimensions:
+        kwargs["dimensions"] = dimensions
+    with span("openai.embeddings"):
+        resp = client.embeddings.create(model=model, input=texts, **kwargs)
     return [d.embedding for d in resp.data]
+
+
+def create_embeddings(
+    texts: List[str],
+    hedged: bool = False,
+    model: Optional[str] = None,
+    dimensions: Optional[int] = None,
+) -> List[List[float]]:
+    """
+    Embed texts. hedged=True is meant for small latency-sensitive calls.
+    model/dimensions default to OPENAI_EMBEDDING_MODEL/OPENAI_EMBEDDING_DIMENSIONS;
+    pass both to match a specific index (see search_client.resolve_search_target).
+    """
+    if model is None:
+        model, dimensions = _settings.OPENAI_EMBEDDING_MODEL, _settings.OPENAI_EMBEDDING_DIMENSIONS
+    if hedged:
+        return _embedding_hedger.call(_create_embeddings, texts, model, dimensions)
+    return _create_embeddings(texts, model, dimensions)
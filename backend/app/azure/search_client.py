@@ -1,9 +1,17 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+
 from azure.search.documents import SearchClient
 from azure.search.documents.models import VectorizedQuery
 from azure.core.credentials import AzureKeyCredential
+from loguru import logger
 
 from ..config import get_settings
 from ..azure.openai_client import create_embeddings
+from ..utils.cache import LRUCache
+from ..utils.hedging import Hedger
+from ..utils.profiling import span
+from .index_admin import get_alias_target, read_index_embedding_config
 
 _settings = get_settings()
 
@@ -14,15 +22,96 @@ _search_client = SearchClient(
 )
 
 
-def get_search_client() -> SearchClient:
-    return _search_client
+_search_hedger = Hedger("search")
+
+
+_other_clients: Dict[str, SearchClient] = {}
+
+
+def get_search_client(index_name: str | None = None) -> SearchClient:
+    """Client for the configured index/alias, or for another index (e.g. during reindex)."""
+    if index_name is None or index_name == _settings.AZURE_SEARCH_INDEX_NAME:
+        return _search_client
+    if index_name not in _other_clients:
+        _other_clients[index_name] = SearchClient(
+            endpoint=_settings.AZURE_SEARCH_ENDPOINT,
+            index_name=index_name,
+            credential=AzureKeyCredential(_settings.AZURE_SEARCH_API_KEY),
+        )
+    return _other_clients[index_name]
+
+
+@dataclass(frozen=True)
+class SearchTarget:
+    """A concrete index and the embedding model its vectors were made with."""
+
+    index: str
+    embedding_model: str
+    embedding_dimensions: Optional[int]
+
+    def embed(self, texts, hedged: bool = False):
+        return create_embeddings(
+            texts, hedged=hedged, model=self.embedding_model, dimensions=self.embedding_dimensions
+        )
+
+
+_targets = LRUCache(max_entries=16, ttl_seconds=_settings.SEARCH_TARGET_REFRESH_SECONDS)
+_last_targets: Dict[str, SearchTarget] = {}
+
+
+def resolve_search_target(index_name: str | None = None) -> SearchTarget:
+    """
+    Resolve an index or alias (default AZURE_SEARCH_INDEX_NAME) to the index it
+    points to, with the embedding model recorded for that index by the reindex
+    command. Queries and uploads then use the index directly, so vectors always
+    match it, even right after an alias swap. Refreshed every
+    SEARCH_TARGET_REFRESH_SECONDS.
+    """
+
+    name = index_name or _settings.AZURE_SEARCH_INDEX_NAME
+    target = _targets.get(name)
+    if target is not None:
+        return target
+
+    try:
+        index = get_alias_target(name) or name
+        config = read_index_embedding_config(index)
+    except Exception as exc:
+        # Keep the last known target rather than guess a model, and retry on
+        # the next call instead of caching the failure.
+        last = _last_targets.get(name)
+        if last is None:
+            raise
+        logger.error(f"Could not resolve search index {name}, keeping {last}: {exc}")
+        return last
+    if config is None:
+        # Indexes not created by the reindex command use the configured model.
+        config = {
+            "model": _settings.OPENAI_EMBEDDING_MODEL,
+            "dimensions": _settings.OPENAI_EMBEDDING_DIMENSIONS,
+        }
+
+    target = SearchTarget(index, config["model"], config["dimensions"])
+    if _last_targets.get(name) not in (None, target):
+        logger.info(f"Search {name} now targets {target}")
+    _last_targets[name] = target
+    _targets.set(name, target)
+    return target
+
+
+def _run_search(client: SearchClient, **kwargs) -> list:
+    # Results are paged lazily; materialize so the request completes inside
+    # the (possibly hedged) call.
+    with span("azure.search"):
+        return list(client.search(**kwargs))
 
 
 def search_hr_documents(query: str, top_k: int = 5, filters: str | None = None):
-    client = get_search_client()
+    target = resolve_search_target()
+    client = get_search_client(target.index)
 
     # Generate embedding for the query for vector search
-    query_embedding = create_embeddings([query])[0]
+    query_embedding = target.embed([query], hedged=True)[0]
 
     # Create vector query using the proper SDK model
     vector_query = VectorizedQuery(
@@ -32,7 +121,9 @@ def search_hr_documents(query: str, top_k: int = 5, filters: str | None = None):
     )
 
     # Perform hybrid search (both text and vector)
-    results = client.search(
+    results = _search_hedger.call(
+        _run_search,
+        client,
         search_text=query,
         top=top_k,
         filter=filters,
@@ -19,6 +19,8 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str
     OPENAI_CHAT_MODEL: str = "gpt-4o-mini"
     OPENAI_EMBEDDING_MODEL: str = "text-embedding-ada-002"
+    # Truncated vectors for text-embedding-3-*; unset = model default (ada-002: 1536)
+    OPENAI_EMBEDDING_DIMENSIONS: int | None = None
 
     # Azure OpenAI (Backup/Optional)
     AZURE_OPENAI_ENDPOINT: str
@@ -30,7 +32,11 @@ class Settings(BaseSettings):
     # Azure Cognitive Search
     AZURE_SEARCH_ENDPOINT: str
     AZURE_SEARCH_API_KEY: str
-    AZURE_SEARCH_INDEX_NAME: str
+    AZURE_SEARCH_INDEX_NAME: str  # index or alias name; use an alias to allow zero-downtime reindexing
+    # How often the index behind an alias (and its embedding model) is re-resolved
+    SEARCH_TARGET_REFRESH_SECONDS: int = 60
+    # Vector compression for indexes created by the reindex command: "none" or "int8"
+    AZURE_SEARCH_VECTOR_QUANTIZATION: str = "none"
 
     # Azure Blob Storage (optional)
     AZURE_BLOB_CONNECTION_STRING: str | None = None
@@ -40,6 +46,62 @@ class Settings(BaseSettings):
     AZURE_FORMRECOG_ENDPOINT: str | None = None
     AZURE_FORMRECOG_API_KEY: str | None = None
 
+    # Ingestion: per-page OCR fallback
+    OCR_MIN_PAGE_CHARS: int = 30  # pages with less text are sent to Document Intelligence
+    DOCINTEL_PAGES_PER_REQUEST: int = 10
+    DOCINTEL_MAX_CONCURRENCY: int = 4
+    DOCINTEL_TIMEOUT_SECONDS: float = 120.0
+
+    # Ingestion: extraction cache keyed by PDF content hash
+    EXTRACTION_CACHE_MAX_ENTRIES: int = 64
+
+    # Ingestion: pipeline batching and backpressure
+    EMBEDDING_BATCH_SIZE: int = 16
+    INGEST_QUEUE_SIZE: int = 4  # max items buffered between two stages
+    INGEST_MAX_PARALLEL_FILES: int = 4  # files extracted concurrently
+    MAX_BATCH_FILES: int = 500
+    MAX_PDF_BYTES: int = 50 * 1024 * 1024
+
+    # Conversations (multi-turn /query)
+    CONVERSATION_TTL_SECONDS: int = 3600
+    CONVERSATION_MAX_SESSIONS: int = 1000
+    CONVERSATION_HISTORY_TOKEN_BUDGET: int = 1200  # verbatim turns kept in the prompt
+    CONVERSATION_SUMMARY_MAX_TOKENS: int = 300  # rolling summary of older turns
+    CONVERSATION_REUSED_CHUNKS: int = 5  # chunks carried over from the previous turn
+    CONTEXT_TOKEN_BUDGET: int = 3000  # retrieved context sent to the answer model
+
+    # Hedged requests for query-time search and embedding calls (opt-in)
+    HEDGING_ENABLED: bool = False
+    HEDGE_DELAY_MS: int | None = None  # fixed delay; unset = observed latency quantile
+    HEDGE_DELAY_QUANTILE: float = 0.95
+    HEDGE_MIN_DELAY_MS: int = 50
+    HEDGE_MIN_SAMPLES: int = 20  # no hedging until this many latencies are observed
+    HEDGE_BUDGET_PER_MINUTE: int = 60  # per call type
+    HEDGE_MAX_WORKERS: int = 80  # never below twice the request threadpool (40)
+
+    # Local cache of chat completions for exact prompt repeats
+    LLM_RESPONSE_CACHE_SIZE: int = 512
+    LLM_RESPONSE_CACHE_TTL_SECONDS: int = 3600
+
+    # Request profiling and slow-request capture
+    PROFILING_ENABLED: bool = True
+    PROFILE_SAMPLE_RATE: float = 0.0  # fraction of requests that also run cProfile
+    PROFILE_HEADER: str = "X-Profile"  # forces a profile; must equal ADMIN_API_KEY
+    SLOW_REQUEST_THRESHOLD_MS: int = 5000
+    PROFILE_RING_SIZE: int = 50  # captures kept, in blob storage under profiles/
+    PROFILE_DIR: str = "/tmp/hr-profiles"  # used instead when blob storage is not configured
+    PROFILE_TOP_FUNCTIONS: int = 40
+
+    # Server processes (gunicorn.conf.py): "all", "query" (/query only) or
+    # "ingest" (uploads only), so ingestion can run in its own deployment
+    SERVER_ROLE: str = "all"
+    WEB_CONCURRENCY: int | None = None  # worker processes; unset = sized from available CPUs
+    SERVER_MAX_WORKERS: int = 8
+    SERVER_WORKER_TIMEOUT: int = 120  # seconds a worker may go without a heartbeat
+
+    # Admin endpoints (/api/v1/admin), disabled when unset; requests need X-Admin-Key
+    ADMIN_API_KEY: str | None = None
+
     # Misc
     LOG_LEVEL: str = "INFO"
 
@@ -0,0 +1,187 @@
+import copy
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Callable, List, Optional
+
+from loguru import logger
+
+from ..agents.history_summarizer import summarize_history
+from ..azure.blob_client import blob_storage_enabled, download_json_with_etag, upload_json_if_match
+from ..config import get_settings
+from ..langgraph.state import ConversationTurn, RetrievedChunk
+from ..utils.cache import LRUCache
+from ..utils.tokens import count_tokens
+
+_settings = get_settings()
+
+# Optimistic-concurrency retries when another request updates the same conversation.
+MAX_UPDATE_ATTEMPTS = 5
+
+
+@dataclass
+class Conversation:
+    id: str
+    summary: str = ""
+    turns: List[ConversationTurn] = field(default_factory=list)
+    last_chunks: List[RetrievedChunk] = field(default_factory=list)
+    updated_at: float = 0.0
+
+
+def _is_conversation_id(value: str) -> bool:
+    try:
+        return str(uuid.UUID(value)) == value
+    except ValueError:
+        return False
+
+
+class ConversationStore:
+    """
+    Conversation sessions shared by every worker and replica, stored as
+    conversations/{id}.json blobs and updated with ETag checks. Sessions idle
+    for longer than the TTL start fresh; add a storage lifecycle rule on the
+    conversations/ prefix to delete them.
+
+    Without blob storage (local development) sessions live in process memory,
+    evicted by LRU and idle TTL.
+    """
+
+    def __init__(self, max_sessions: int, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._cache = LRUCache(max_entries=max_sessions, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _blob_name(conversation_id: str) -> str:
+        return f"conversations/{conversation_id}.json"
+
+    def _load(self, conversation_id: str):
+        """(conversation or None, etag) from blob storage."""
+
+        payload, etag = download_json_with_etag(self._blob_name(conversation_id))
+        if payload is None or time.time() - payload.get("updated_at", 0) > self.ttl_seconds:
+            return None, etag
+        return Conversation(**payload), etag
+
+    def get_or_create(self, conversation_id: Optional[str]) -> Conversation:
+        # Ids name blobs, so anything but a canonical UUID gets a fresh one.
+        if conversation_id and not _is_conversation_id(conversation_id):
+            conversation_id = None
+        if conversation_id:
+            if not blob_storage_enabled():
+                conversation = copy.deepcopy(self._cache.get(conversation_id))
+            else:
+                try:
+                    conversation, _ = self._load(conversation_id)
+                except Exception as exc:
+                    logger.error(f"Failed to load conversation {conversation_id}: {exc}")
+                    conversation = None
+            if conversation is not None:
+                return conversation
+        # Unknown or expired ids start fresh.
+        return Conversation(id=conversation_id or str(uuid.uuid4()))
+
+    def update(
+        self, conversation_id: str, change: Callable[[Conversation], bool]
+    ) -> Optional[Conversation]:
+        """
+        Apply change to the latest stored version of the conversation and save
+        it. change mutates the conversation and returns False to skip saving; it
+        may run several times when concurrent updates conflict. Returns the
+        saved conversation, or None if it could not be saved.
+        """
+
+        if not blob_storage_enabled():
+            with self._lock:
+                conversation = copy.deepcopy(self._cache.get(conversation_id)) or Conversation(
+                    id=conversation_id
+                )
+                if change(conversation):
+                    conversation.updated_at = time.time()
+                    self._cache.set(conversation_id, conversation)
+            return conversation
+
+        for _ in range(MAX_UPDATE_ATTEMPTS):
+            try:
+                conversation, etag = self._load(conversation_id)
+                conversation = conversation or Conversation(id=conversation_id)
+                if not change(conversation):
+                    return conversation
+                conversation.updated_at = time.time()
+                if upload_json_if_match(self._blob_name(conversation_id), asdict(conversation), etag):
+                    return conversation
+            except Exception as exc:
+                logger.error(f"Failed to save conversation {conversation_id}: {exc}")
+                return None
+        logger.warning(f"Gave up saving conversation {conversation_id} after {MAX_UPDATE_ATTEMPTS} conflicts")
+        return None
+
+
+conversation_store = ConversationStore(
+    max_sessions=_settings.CONVERSATION_MAX_SESSIONS,
+    ttl_seconds=_settings.CONVERSATION_TTL_SECONDS,
+)
+
+# Serializes compactions of the same conversation within a process; ETag
+# checks cover other processes.
+_compaction_locks = [threading.Lock() for _ in range(64)]
+
+
+def _turn_tokens(turn: ConversationTurn) -> int:
+    return count_tokens(turn["content"]) + 4  # role and message framing
+
+
+def recent_turns(turns: List[ConversationTurn], max_tokens: int) -> List[ConversationTurn]:
+    """
+    Newest turns whose combined size fits in max_tokens, oldest first. Never
+    starts with an assistant turn whose question was cut off.
+    """
+
+    kept: List[ConversationTurn] = []
+    used = 0
+    for turn in reversed(turns):
+        used += _turn_tokens(turn)
+        if used > max_tokens:
+            break
+        kept.append(turn)
+    kept.reverse()
+    while kept and kept[0]["role"] != "user":
+        kept.pop(0)
+    return kept
+
+
+def compact_history(conversation_id: str) -> None:
+    """
+    Once the verbatim turns exceed CONVERSATION_HISTORY_TOKEN_BUDGET, fold the
+    oldest user/assistant pairs into the rolling summary, keeping the newest
+    half of the budget.
+    """
+
+    with _compaction_locks[hash(conversation_id) % len(_compaction_locks)]:
+        conversation = conversation_store.get_or_create(conversation_id)
+        budget = _settings.CONVERSATION_HISTORY_TOKEN_BUDGET
+        turns = list(conversation.turns)
+        if sum(_turn_tokens(t) for t in turns) <= budget:
+            return
+
+        kept = recent_turns(turns, budget // 2)
+        folded = turns[: len(turns) - len(kept)]
+        summary = conversation.summary
+
+        try:
+            summary = summarize_history(conversation.summary, folded)
+        except Exception as exc:
+            # Dropping the folded turns still keeps the prompt bounded.
+            logger.error(f"History summarization failed for {conversation_id}: {exc}")
+
+        def apply(latest: Conversation) -> bool:
+            # Another process compacted first: its summary already covers these turns.
+            if latest.summary != conversation.summary or latest.turns[: len(folded)] != folded:
+                return False
+            latest.summary = summary
+            # Turns appended while summarizing are kept.
+            latest.turns = latest.turns[len(folded):]
+            return True
+
+        conversation_store.update(conversation_id, apply)
@@ -0,0 +1,38 @@
+import posixpath
+import zipfile
+from typing import BinaryIO, Callable, List, Tuple
+
+
+def list_pdfs_in_zip(
+    fileobj: BinaryIO, max_files: int, max_file_bytes: int
+) -> List[Tuple[str, Callable[[], bytes]]]:
+    """
+    Returns (filename, load_bytes) for every PDF in a zip archive. Entries are
+    read lazily so the whole archive is never expanded in memory at once.
+    Raises ValueError for invalid archives or entries above the limits.
+    """
+
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as exc:
+        raise ValueError(f"Invalid zip archive: {exc}") from exc
+
+    entries = [
+        info
+        for info in archive.infolist()
+        if not info.is_dir()
+        and info.filename.lower().endswith(".pdf")
+        and not info.filename.startswith("__MACOSX/")
+    ]
+    if len(entries) > max_files:
+        raise ValueError(f"Archive contains {len(entries)} PDFs, the limit is {max_files}.")
+
+    for info in entries:
+        # Declared size; the zip module also refuses to read past it.
+        if info.file_size > max_file_bytes:
+            raise ValueError(f"{info.filename} is larger than {max_file_bytes} bytes.")
+
+    return [
+        (posixpath.basename(info.filename), lambda info=info: archive.read(info))
+        for info in entries
+    ]
@@ -0,0 +1,44 @@
+import hashlib
+from typing import Dict, Optional
+
+from loguru import logger
+
+from ..azure.blob_client import download_json_from_blob, upload_json_to_blob
+from ..config import get_settings
+from ..utils.cache import LRUCache
+
+_settings = get_settings()
+
+# Process-local first level; blob storage (when configured) is shared by all pods.
+_extraction_cache = LRUCache(max_entries=_settings.EXTRACTION_CACHE_MAX_ENTRIES)
+
+
+def compute_content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _blob_name(content_hash: str, version: str) -> str:
+    return f"extractions/{content_hash}-v{version}.json"
+
+
+def get_cached_extraction(content_hash: str, version: str) -> Optional[Dict]:
+    """
+    Returns {"pages": int, "extraction_method": str, "chunks": [{"page": int, "content": str}]}
+    for a previously ingested PDF, or None.
+    """
+
+    key = (content_hash, version)
+    entry = _extraction_cache.get(key)
+    if entry is not None:
+        return entry
+
+    entry = download_json_from_blob(_blob_name(content_hash, version))
+    if entry is not None:
+        logger.info(f"Loaded cached extraction for {content_hash} from blob storage")
+        _extraction_cache.set(key, entry)
+    return entry
+
+
+def store_extraction(content_hash: str, version: str, entry: Dict) -> None:
+    _extraction_cache.set((content_hash, version), entry)
+    upload_json_to_blob(_blob_name(content_hash, version), entry)
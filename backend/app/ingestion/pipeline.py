@@ -0,0 +1,214 @@
+import contextvars
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from ..utils.profiling import cpu_profile, span
+
+_DONE = object()
+
+# A stage turns an iterator of inputs into an iterator of outputs.
+StageFn = Callable[[Iterator], Iterable]
+
+
+@dataclass
+class StageStats:
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    busy_seconds: float = 0.0
+    wait_seconds: float = 0.0  # blocked on an empty input or a full output queue
+
+    def merge(self, other: "StageStats") -> None:
+        self.items_in += other.items_in
+        self.items_out += other.items_out
+        self.busy_seconds += other.busy_seconds
+        self.wait_seconds += other.wait_seconds
+
+    def as_dict(self) -> Dict:
+        return {
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wait_seconds": round(self.wait_seconds, 3),
+            "items_per_second": (
+                round(max(self.items_in, self.items_out) / self.busy_seconds, 2)
+                if self.busy_seconds
+                else None
+            ),
+        }
+
+
+class PipelineError(RuntimeError):
+    def __init__(self, stage: str, exc: BaseException):
+        super().__init__(f"Ingestion stage '{stage}' failed: {exc}")
+        self.stage = stage
+        self.__cause__ = exc
+
+
+def _emit(
+    stats: StageStats,
+    outputs: Iterable,
+    outq: Optional[queue.Queue],
+    abort: threading.Event,
+) -> None:
+    for item in outputs:
+        if abort.is_set():
+            break
+        stats.items_out += 1
+        if outq is not None:
+            started = time.perf_counter()
+            outq.put(item)
+            stats.wait_seconds += time.perf_counter() - started
+
+
+def _run_sources(
+    stats: StageStats,
+    sources: Iterator[Iterable],
+    sources_lock: threading.Lock,
+    outq: Optional[queue.Queue],
+    abort: threading.Event,
+    errors: List[Tuple[str, BaseException]],
+) -> None:
+    started = time.perf_counter()
+    try:
+        with span(f"ingest.{stats.name}"), cpu_profile():
+            _drain_sources(stats, sources, sources_lock, outq, abort)
+    except BaseException as exc:
+        logger.error(f"Ingestion stage {stats.name} failed: {exc}")
+        errors.append((stats.name, exc))
+        abort.set()
+    finally:
+        stats.busy_seconds = time.perf_counter() - started - stats.wait_seconds
+
+
+def _drain_sources(
+    stats: StageStats,
+    sources: Iterator[Iterable],
+    sources_lock: threading.Lock,
+    outq: Optional[queue.Queue],
+    abort: threading.Event,
+) -> None:
+    while not abort.is_set():
+        with sources_lock:
+            source = next(sources, None)
+        if source is None:
+            break
+        _emit(stats, source, outq, abort)
+
+
+def _run_stage(
+    stats: StageStats,
+    fn: StageFn,
+    inq: queue.Queue,
+    outq: Optional[queue.Queue],
+    abort: threading.Event,
+    errors: List[Tuple[str, BaseException]],
+) -> None:
+    upstream_done = False
+
+    def inputs() -> Iterator:
+        nonlocal upstream_done
+        while True:
+            started = time.perf_counter()
+            item = inq.get()
+            stats.wait_seconds += time.perf_counter() - started
+            if item is _DONE:
+                upstream_done = True
+                return
+            if abort.is_set():
+                return
+            stats.items_in += 1
+            yield item
+
+    started = time.perf_counter()
+    try:
+        with span(f"ingest.{stats.name}"), cpu_profile():
+            _emit(stats, fn(inputs()), outq, abort)
+    except BaseException as exc:
+        logger.error(f"Ingestion stage {stats.name} failed: {exc}")
+        errors.append((stats.name, exc))
+        abort.set()
+    finally:
+        # Keep consuming so the upstream stage never blocks on a full queue.
+        while not upstream_done:
+            upstream_done = inq.get() is _DONE
+        if outq is not None:
+            outq.put(_DONE)
+        stats.busy_seconds = time.perf_counter() - started - stats.wait_seconds
+
+
+def run_pipeline(
+    source_name: str,
+    sources: List[Iterable],
+    stages: List[Tuple[str, StageFn]],
+    queue_size: int,
+    source_workers: int = 1,
+) -> Dict[str, StageStats]:
+    """
+    Run sources -> stages[0] -> ... -> stages[-1] connected by bounded queues.
+
+    Up to source_workers threads drain the sources concurrently into the first
+    queue; every other stage runs in one thread, so batches are shared across
+    sources. The last stage is the sink: whatever it yields is counted and
+    dropped. Returns per-stage stats; raises PipelineError if a stage failed.
+    """
+
+    stats = {name: StageStats(name) for name in [source_name] + [n for n, _ in stages]}
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    abort = threading.Event()
+    errors: List[Tuple[str, BaseException]] = []
+
+    source_iter = iter(sources)
+    sources_lock = threading.Lock()
+    source_stats = [StageStats(source_name) for _ in range(max(1, min(source_workers, len(sources))))]
+    source_threads = [
+        threading.Thread(
+            # Each thread gets its own copy of the caller's context (request profile).
+            target=contextvars.copy_context().run,
+            args=(_run_sources, worker_stats, source_iter, sources_lock, queues[0] if queues else None, abort, errors),
+            name=f"ingest-{source_name}-{i}",
+            daemon=True,
+        )
+        for i, worker_stats in enumerate(source_stats)
+    ]
+
+    stage_threads = []
+    for i, (name, fn) in enumerate(stages):
+        outq = queues[i + 1] if i + 1 < len(queues) else None
+        stage_threads.append(
+            threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(_run_stage, stats[name], fn, queues[i], outq, abort, errors),
+                name=f"ingest-{name}",
+                daemon=True,
+            )
+        )
+
+    for thread in source_threads + stage_threads:
+        thread.start()
+    for thread in source_threads:
+        thread.join()
+    if queues:
+        queues[0].put(_DONE)
+    for thread in stage_threads:
+        thread.join()
+
+    for worker_stats in source_stats:
+        stats[source_name].merge(worker_stats)
+
+    logger.info(
+        "Ingestion pipeline stages: "
+        + ", ".join(
+            f"{s.name}={s.items_out} items/{s.busy_seconds:.2f}s busy/{s.wait_seconds:.2f}s wait"
+            for s in stats.values()
+        )
+    )
+
+    if errors:
+        raise PipelineError(*errors[0])
+    return stats
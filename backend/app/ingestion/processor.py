@@ -1,17 +1,27 @@
-import uuid
+from dataclasses import dataclass, field
 from io import BytesIO
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 import pypdf
-import tiktoken
 from loguru import logger
 
-from ..azure.openai_client import create_embeddings
-from ..azure.search_client import get_search_client
-from ..azure.document_intelligence import extract_pages_via_document_intelligence
+from ..azure.blob_client import upload_pdf_to_blob
+from ..azure.search_client import SearchTarget, get_search_client, resolve_search_target
+from ..azure.document_intelligence import iter_page_ranges_via_document_intelligence
+from ..config import get_settings
+from ..utils.profiling import span
+from ..utils.tokens import get_encoder
+from .cache import compute_content_hash, get_cached_extraction, store_extraction
+from .pipeline import PipelineError, StageFn, run_pipeline
 
 
-_encoder = tiktoken.encoding_for_model("gpt-4o")
+_settings = get_settings()
+
+_encoder = get_encoder()
+
+# Bump whenever extraction or chunking output changes, so cached results are rebuilt.
+EXTRACTOR_VERSION = "2"
+CHUNK_MAX_TOKENS = 700
 
 
 def _chunk_text(text: str, max_tokens: int = 700) -> List[str]:
@@ -25,111 +35,331 @@ def _chunk_text(text: str, max_tokens: int = 700) -> List[str]:
     return chunks
 
 
-def _extract_pages_from_pdf(pdf_bytes: bytes) -> List[Dict]:
+def _iter_pages_from_pdf(pdf_bytes: bytes) -> Iterator[Dict]:
     """
-    Returns list of {"page": int, "text": str}
+    Yields {"page": int, "text": str} for every page, text may be empty
     """
 
-    reader = pypdf.PdfReader(BytesIO(pdf_bytes))
-    pages = []
+    with span("pypdf.open"):
+        reader = pypdf.PdfReader(BytesIO(pdf_bytes))
 
     for i, page in enumerate(reader.pages):
-        text = page.extract_text()
-        if not text:
-            continue
-        clean_text = text.replace("\n", " ").strip()
-        if clean_text:
-            pages.append({"page": i + 1, "text": clean_text})
-
-    return pages
-
-
-def _extract_pages(pdf_bytes: bytes) -> Tuple[List[Dict], str]:
-    # Force pypdf extraction for now to bypass Document Intelligence limitations
-    logger.info("Using pypdf extraction to get all pages")
-    pypdf_pages = _extract_pages_from_pdf(pdf_bytes)
-    logger.info(f"pypdf returned {len(pypdf_pages)} pages")
-    if pypdf_pages:
-        return pypdf_pages, "pypdf"
-    
-    # Fallback to Document Intelligence if pypdf fails
-    try:
-        logger.info(f"Falling back to Document Intelligence extraction for {len(pdf_bytes)} bytes")
-        di_pages = extract_pages_via_document_intelligence(pdf_bytes)
-        logger.info(f"Document Intelligence returned {len(di_pages)} pages")
-        return di_pages, "document_intelligence"
-    except Exception as exc:
-        logger.error(f"Document Intelligence extraction error: {exc}")
-        return [], "failed"
+        with span("pypdf.extract_page"):
+            text = page.extract_text() or ""
+        yield {"page": i + 1, "text": text.replace("\n", " ").strip()}
 
 
-def ingest_pdf_bytes(pdf_bytes: bytes, filename: str) -> Dict:
+def _needs_ocr(text: str) -> bool:
+    """True for pages that are empty, near-empty or mostly unreadable glyphs."""
+
+    if len(text) < _settings.OCR_MIN_PAGE_CHARS:
+        return True
+    readable = sum(1 for ch in text if ch.isalnum() or ch.isspace())
+    return readable / len(text) < 0.6
+
+
+def _page_ranges(page_numbers: List[int], max_pages: int) -> List[Tuple[int, int]]:
+    """Group sorted page numbers into inclusive (start, end) runs of at most max_pages."""
+
+    ranges: List[Tuple[int, int]] = []
+    for number in page_numbers:
+        if ranges:
+            start, end = ranges[-1]
+            if number == end + 1 and number - start < max_pages:
+                ranges[-1] = (start, number)
+                continue
+        ranges.append((number, number))
+    return ranges
+
+
+def _iter_extracted_pages(pdf_bytes: bytes, report: Dict) -> Iterator[Dict]:
     """
-    Full ingestion:
-    - extract text per page
-    - chunk
-    - embed
-    - upload to Azure Search
+    Yields readable pages as soon as pypdf reads them, then OCRs only the pages
+    pypdf could not read, yielding each range as soon as it is analyzed. Sets
+    report["extraction_method"] once exhausted, and report["ocr_failed_pages"]
+    to the pages Document Intelligence could not analyze.
     """
 
-    pages, extraction_method = _extract_pages(pdf_bytes)
+    ocr_candidates: Dict[int, Dict] = {}
+    pypdf_count = 0
+    for page in _iter_pages_from_pdf(pdf_bytes):
+        if _needs_ocr(page["text"]):
+            ocr_candidates[page["page"]] = page
+        else:
+            pypdf_count += 1
+            yield page
+
+    logger.info(f"pypdf read {pypdf_count} pages, {len(ocr_candidates)} need OCR")
 
-    if not pages:
-        return {
-            "status": "no_text",
-            "file": filename,
+    di_count = 0
+    page_ranges = _page_ranges(sorted(ocr_candidates), _settings.DOCINTEL_PAGES_PER_REQUEST)
+    if page_ranges:
+        logger.info(f"Sending page ranges {page_ranges} to Document Intelligence")
+    for (start, end), range_pages in iter_page_ranges_via_document_intelligence(pdf_bytes, page_ranges):
+        if range_pages is None:
+            report["ocr_failed_pages"].extend(range(start, end + 1))
+        di_pages = {p["page"]: p for p in range_pages or []}
+        di_count += len(di_pages)
+        for number in range(start, end + 1):
+            # Keep whatever pypdf found when OCR produced nothing for the page.
+            page = di_pages.get(number, ocr_candidates[number])
+            if not page["text"]:
+                continue
+            if number not in di_pages:
+                pypdf_count += 1
+            yield page
+
+    if page_ranges:
+        logger.info(f"Document Intelligence returned {di_count} pages")
+    if report["ocr_failed_pages"]:
+        logger.warning(f"OCR failed for pages {report['ocr_failed_pages']}, extraction will not be cached")
+
+    if not pypdf_count and not di_count:
+        report["extraction_method"] = "failed"
+    elif not di_count:
+        report["extraction_method"] = "pypdf"
+    elif not pypdf_count:
+        report["extraction_method"] = "document_intelligence"
+    else:
+        report["extraction_method"] = "pypdf+document_intelligence"
+
+
+@dataclass
+class _IngestJob:
+    """One PDF travelling through the shared pipeline."""
+
+    filename: str
+    load: Callable[[], bytes]
+    store_blob: bool = True
+    content_hash: str = ""
+    cache_hit: bool = False
+    pages: int = 0
+    position: int = 0
+    chunk_log: List[Dict] = field(default_factory=list)
+    report: Dict = field(default_factory=dict)
+    done: bool = False
+
+    def __post_init__(self):
+        self.report.update({
+            "status": None,
+            "file": self.filename,
+            "content_hash": None,
             "pages": 0,
             "chunks": 0,
             "failed": 0,
-            "extraction_method": extraction_method,
+            "extraction_method": None,
+            "ocr_failed_pages": [],
+            "extraction_cache_hit": False,
+            "blob_url": None,
+            "blob_cache_hit": False,
+        })
+
+    def index_doc(self, chunk: Dict) -> Dict:
+        # Ids derive from the content hash, so re-ingesting a PDF overwrites its
+        # previous chunks instead of duplicating them.
+        doc = {
+            "id": f"{self.content_hash}-{self.position}",
+            "content": chunk["content"],
+            "source": self.filename,
+            "page": chunk["page"],
         }
+        self.position += 1
+        return doc
 
-    docs_for_index = []
-    all_texts = []
+    def result(self) -> Dict:
+        report = self.report
+        if report.get("status") != "error":
+            if not self.pages:
+                report["status"] = "no_text"
+            elif not report["chunks"]:
+                report["status"] = "no_chunks"
+            else:
+                report["status"] = "ok" if report["failed"] == 0 else "partial"
+        return report
 
-    for page_info in pages:
-        page_number = page_info["page"]
-        text = page_info["text"]
 
-        chunks = _chunk_text(text, max_tokens=700)
+def _document_source(job: _IngestJob) -> Iterator[Tuple]:
+    """
+    Yields (job, "page", page) or, on a cache hit, (job, "chunk", chunk) items,
+    then always (job, "done", None).
+    """
+
+    try:
+        pdf_bytes = job.load()
+        if not pdf_bytes:
+            raise ValueError("Empty file.")
 
-        for chunk in chunks:
-            doc_id = str(uuid.uuid4())
-            docs_for_index.append(
-                {
-                    "id": doc_id,
-                    "content": chunk,
-                    "source": filename,
-                    "page": page_number,
-                }
+        job.content_hash = compute_content_hash(pdf_bytes)
+        job.report["content_hash"] = job.content_hash
+        if job.store_blob:
+            job.report["blob_url"], job.report["blob_cache_hit"] = upload_pdf_to_blob(
+                job.filename, pdf_bytes, job.content_hash
             )
-            all_texts.append(chunk)
 
-    if not docs_for_index:
-        return {
-            "status": "no_chunks",
-            "file": filename,
-            "pages": len(pages),
-            "chunks": 0,
-            "failed": 0,
-            "extraction_method": extraction_method,
-        }
+        cached = get_cached_extraction(job.content_hash, EXTRACTOR_VERSION)
+        if cached is not None:
+            logger.info(f"Extraction cache hit for {job.filename} ({job.content_hash})")
+            job.cache_hit = True
+            job.pages = cached["pages"]
+            job.report["extraction_method"] = cached["extraction_method"]
+            for chunk in cached["chunks"]:
+                yield job, "chunk", chunk
+        else:
+            for page in _iter_extracted_pages(pdf_bytes, job.report):
+                job.pages += 1
+                yield job, "page", page
+    except Exception as exc:
+        logger.error(f"Failed to extract {job.filename}: {exc}")
+        job.report["status"] = "error"
+        job.report["error"] = str(exc)
+
+    job.report["pages"] = job.pages
+    job.report["extraction_cache_hit"] = job.cache_hit
+    yield job, "done", None
+
+
+def _chunk_stage(items: Iterator[Tuple]) -> Iterator[Tuple]:
+    for job, kind, payload in items:
+        if kind == "page":
+            for text in _chunk_text(payload["text"], max_tokens=CHUNK_MAX_TOKENS):
+                chunk = {"page": payload["page"], "content": text}
+                job.chunk_log.append(chunk)
+                yield job, "doc", job.index_doc(chunk)
+        elif kind == "chunk":
+            yield job, "doc", job.index_doc(payload)
+        else:
+            # A lossy extraction is not cached, so the next upload retries OCR.
+            if (
+                job.chunk_log
+                and job.report.get("status") != "error"
+                and not job.report["ocr_failed_pages"]
+            ):
+                store_extraction(
+                    job.content_hash,
+                    EXTRACTOR_VERSION,
+                    {
+                        "pages": job.pages,
+                        "extraction_method": job.report["extraction_method"],
+                        "chunks": job.chunk_log,
+                    },
+                )
+            job.chunk_log = []
+            yield job, "done", None
+
+
+def _embed_stage(target: SearchTarget) -> StageFn:
+    """
+    Batches docs across files. Yields (entries, finished_jobs): a job is listed
+    with the batch holding its last doc, so it completes once that is indexed.
+    """
+
+    def run(items: Iterator[Tuple]) -> Iterator[Tuple[List, List]]:
+        entries: List[Tuple[_IngestJob, Dict]] = []
+        finished: List[_IngestJob] = []
+
+        def flush():
+            embeddings = target.embed([doc["content"] for _, doc in entries]) if entries else []
+            for (_, doc), emb in zip(entries, embeddings):
+                doc["embedding"] = emb
+            return entries, finished
+
+        for job, kind, payload in items:
+            if kind == "doc":
+                entries.append((job, payload))
+            else:
+                finished.append(job)
+            if len(entries) >= _settings.EMBEDDING_BATCH_SIZE or (finished and not entries):
+                yield flush()
+                entries, finished = [], []
+
+        if entries or finished:
+            yield flush()
 
-    embeddings = create_embeddings(all_texts)
+    return run
 
-    for doc, emb in zip(docs_for_index, embeddings):
-        doc["embedding"] = emb
 
-    search_client = get_search_client()
-    results = search_client.upload_documents(docs_for_index)
+def _index_stage(search_client, on_result: Optional[Callable[[Dict], None]]) -> StageFn:
+    def run(batches: Iterator[Tuple[List, List]]) -> Iterator[List]:
+        for entries, finished in batches:
+            if entries:
+                results = search_client.upload_documents([doc for _, doc in entries])
+                failed_keys = {r.key for r in results if not r.succeeded}
+                for job, doc in entries:
+                    job.report["chunks"] += 1
+                    if doc["id"] in failed_keys:
+                        job.report["failed"] += 1
+            for job in finished:
+                job.done = True
+                if on_result is not None:
+                    on_result(job.result())
+            yield entries
 
-    failed = len([r for r in results if not r.succeeded])
+    return run
 
+
+def ingest_pdf_documents(
+    documents: List[Tuple[str, Callable[[], bytes]]],
+    on_result: Optional[Callable[[Dict], None]] = None,
+    index_name: Optional[str] = None,
+    store_blobs: bool = True,
+) -> Dict:
+    """
+    Ingest many PDFs given as (filename, load_bytes) through one pipeline:
+    - extract text per page, up to INGEST_MAX_PARALLEL_FILES files at once
+      (skipped when the same PDF was seen before)
+    - chunk
+    - embed in batches shared across files
+    - upload each batch to Azure Search
+
+    Stages are connected by bounded queues, so memory stays flat and the first
+    pages are searchable before the last ones are extracted. on_result is
+    called with each file's stats as soon as that file is fully indexed.
+    index_name targets another index or alias than the configured one (reindexing).
+    """
+
+    jobs = [
+        _IngestJob(filename=filename, load=load, store_blob=store_blobs)
+        for filename, load in documents
+    ]
+    # Embed with the model of the index the documents land in, even if the
+    # alias is swapped while this batch runs.
+    target = resolve_search_target(index_name)
+    stages = [
+        ("chunk", _chunk_stage),
+        ("embed", _embed_stage(target)),
+        ("index", _index_stage(get_search_client(target.index), on_result)),
+    ]
+
+    stage_stats: Dict = {}
+    try:
+        stage_stats = run_pipeline(
+            "extract",
+            [_document_source(job) for job in jobs],
+            stages,
+            _settings.INGEST_QUEUE_SIZE,
+            source_workers=_settings.INGEST_MAX_PARALLEL_FILES,
+        )
+    except PipelineError as exc:
+        # Embedding/indexing is shared, so every file not yet indexed fails.
+        for job in jobs:
+            if job.done:
+                continue
+            job.report["status"] = "error"
+            job.report["error"] = str(exc)
+            if on_result is not None:
+                on_result(job.result())
+
+    files = [job.result() for job in jobs]
     return {
-        "status": "ok" if failed == 0 else "partial",
-        "file": filename,
-        "pages": len(pages),
-        "chunks": len(docs_for_index),
-        "failed": failed,
-        "extraction_method": extraction_method,
+        "files": files,
+        "total": len(files),
+        "succeeded": len([f for f in files if f["status"] == "ok"]),
+        "stages": {name: st.as_dict() for name, st in stage_stats.items()},
     }
+
+
+def ingest_pdf_bytes(pdf_bytes: bytes, filename: str) -> Dict:
+    """Ingest a single PDF; see ingest_pdf_documents."""
+
+    summary = ingest_pdf_documents([(filename, lambda: pdf_bytes)])
+    return {**summary["files"][0], "stages": summary["stages"]}
@@ -0,0 +1,185 @@
+"""
+Re-embed every PDF stored in blob storage into a new search index, then point
+the search alias at it:
+
+    python -m app.ingestion.reindex --index hr-documents-v2 --alias hr-search
+
+Run it with the target OPENAI_EMBEDDING_MODEL / OPENAI_EMBEDDING_DIMENSIONS /
+AZURE_SEARCH_VECTOR_QUANTIZATION. They are recorded for the new index, and the
+API embeds queries and uploads with the model of whichever index the alias
+points to, so the deployments need no config change when the alias is swapped.
+
+An alias cannot share its name with an index. When AZURE_SEARCH_INDEX_NAME is
+still a plain index (e.g. hr-documents), migrate once:
+1. run this with a new alias name (--alias hr-search);
+2. set AZURE_SEARCH_INDEX_NAME=hr-search in the deployments' secret and
+   restart them. Both indexes hold every PDF, so the restart order does not
+   matter.
+Later reindexes reuse the same alias.
+
+Before swapping, the documents (distinct sources) of the index currently
+served are compared with the new one. Documents that were never stored in
+blob storage (uploads from before it was configured, or whose blob upload
+failed) cannot be re-embedded; the alias is then left alone unless --force
+is given, and the report lists them so they can be uploaded again.
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List, Optional, Set
+
+from loguru import logger
+
+from ..azure.blob_client import download_blob_bytes, list_pdf_blobs
+from ..azure.index_admin import (
+    QUANTIZATIONS,
+    create_index,
+    get_alias_target,
+    get_index_client,
+    index_exists,
+    swap_alias,
+    write_index_embedding_config,
+)
+from ..azure.openai_client import create_embeddings
+from ..azure.search_client import get_search_client
+from ..config import get_settings
+from ..utils.logging import configure_logging
+from .processor import ingest_pdf_documents
+
+_settings = get_settings()
+
+
+def _embedding_dimensions() -> int:
+    if _settings.OPENAI_EMBEDDING_DIMENSIONS:
+        return _settings.OPENAI_EMBEDDING_DIMENSIONS
+    return len(create_embeddings(["dimension probe"])[0])
+
+
+def _ingest_blobs(index_name: str, skip: Set[str], batch_files: int) -> List[Dict]:
+    results: List[Dict] = []
+    pending = [(name, filename) for name, filename in list_pdf_blobs() if name not in skip]
+    for start in range(0, len(pending), batch_files):
+        batch = pending[start: start + batch_files]
+        summary = ingest_pdf_documents(
+            [(filename, lambda name=name: download_blob_bytes(name)) for name, filename in batch],
+            index_name=index_name,
+            store_blobs=False,
+        )
+        for (name, _), result in zip(batch, summary["files"]):
+            skip.add(name)
+            results.append(result)
+        logger.info(f"Reindexed {len(skip)} PDFs into {index_name}")
+    return results
+
+
+def _failures(results: List[Dict]) -> List[Dict]:
+    return [
+        {"file": r["file"], "status": r["status"], "error": r.get("error")}
+        for r in results
+        if r["status"] not in ("ok", "no_text", "no_chunks")
+    ]
+
+
+def _served_index(alias: str) -> Optional[str]:
+    """Index the deployments query today: the alias target, or before the first
+    swap the plain AZURE_SEARCH_INDEX_NAME index."""
+
+    target = get_alias_target(alias)
+    if target:
+        return target
+    configured = _settings.AZURE_SEARCH_INDEX_NAME
+    return configured if configured != alias and index_exists(configured) else None
+
+
+def _indexed_sources(index_name: str) -> Set[str]:
+    """Distinct document names in an index (source, or file_name in old indexes)."""
+
+    fields = {field.name for field in get_index_client().get_index(index_name).fields}
+    select = [name for name in ("source", "file_name") if name in fields]
+    if not select:
+        logger.warning(f"Index {index_name} has no source field; its documents cannot be compared")
+        return set()
+    results = get_search_client(index_name).search(search_text="*", select=select)
+    return {r.get("source") or r.get("file_name") for r in results} - {None}
+
+
+def reindex(
+    index_name: str,
+    alias: Optional[str] = None,
+    quantization: str = _settings.AZURE_SEARCH_VECTOR_QUANTIZATION,
+    batch_files: int = 20,
+    force: bool = False,
+) -> Dict:
+    # Fail before re-embedding anything rather than at the swap.
+    if index_exists(index_name):
+        raise ValueError(f"Index {index_name} already exists, pick a new name")
+    if alias and index_exists(alias):
+        raise ValueError(f"{alias} is an index; an alias needs a name of its own (see --help)")
+
+    dimensions = _embedding_dimensions()
+    create_index(index_name, dimensions, quantization)
+    if not write_index_embedding_config(
+        index_name, _settings.OPENAI_EMBEDDING_MODEL, _settings.OPENAI_EMBEDDING_DIMENSIONS
+    ):
+        raise RuntimeError("Could not record the embedding model of the new index in blob storage")
+
+    done: Set[str] = set()
+    results = _ingest_blobs(index_name, done, batch_files)
+    # PDFs uploaded while the first pass ran went to the old index only.
+    results += _ingest_blobs(index_name, done, batch_files)
+
+    failed = _failures(results)
+    report = {
+        "index": index_name,
+        "dimensions": dimensions,
+        "quantization": quantization,
+        "files": len(results),
+        "failed": failed,
+        "alias": alias,
+        "previous_index": _served_index(alias) if alias else None,
+        "missing_sources": [],
+        "swapped": False,
+    }
+
+    if alias:
+        if report["previous_index"]:
+            missing = _indexed_sources(report["previous_index"]) - _indexed_sources(index_name)
+            report["missing_sources"] = sorted(missing)
+        if failed and not force:
+            logger.error(f"{len(failed)} PDFs failed, not swapping alias {alias} (use --force)")
+        elif report["missing_sources"] and not force:
+            logger.error(
+                f"{len(report['missing_sources'])} documents of {report['previous_index']} are not "
+                f"in {index_name} (no stored PDF), not swapping alias {alias} (use --force)"
+            )
+        else:
+            swap_alias(alias, index_name)
+            report["swapped"] = True
+            # Until the API re-resolves the alias, uploads still go to the old
+            # index; their PDFs are in blob storage, so pick them up afterwards.
+            time.sleep(_settings.SEARCH_TARGET_REFRESH_SECONDS + 5)
+            late = _ingest_blobs(index_name, done, batch_files)
+            report["files"] += len(late)
+            report["failed"] += _failures(late)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", required=True, help="name of the new index to create and fill")
+    parser.add_argument("--alias", help="alias to point at the new index once it is complete")
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, default=_settings.AZURE_SEARCH_VECTOR_QUANTIZATION)
+    parser.add_argument("--batch-files", type=int, default=20, help="PDFs per ingestion batch")
+    parser.add_argument("--force", action="store_true", help="swap the alias even if some PDFs failed or documents are missing")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    report = reindex(args.index, args.alias, args.quantization, args.batch_files, args.force)
+    print(json.dumps(report, indent=2))
+    return 0 if report["swapped"] or not args.alias else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
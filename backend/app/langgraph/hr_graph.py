@@ -1,22 +1,26 @@
 from langgraph.graph import StateGraph, END
 from .state import HRState
+from ..agents.query_rewriter import rewrite_query
 from ..agents.input_classifier import classify_intent
 from ..agents.retriever import retrieve_documents
 from ..agents.reasoning import generate_answer
 from ..agents.policy_checker import policy_check
+from ..utils.profiling import timed
 
 
 def build_hr_assistant_graph():
     graph = StateGraph(HRState)
 
     # Nodes
-    graph.add_node("classify_intent", classify_intent)
-    graph.add_node("retrieve_docs", retrieve_documents)
-    graph.add_node("generate_answer", generate_answer)
-    graph.add_node("policy_check", policy_check)
+    graph.add_node("rewrite_query", timed("node.rewrite_query")(rewrite_query))
+    graph.add_node("classify_intent", timed("node.classify_intent")(classify_intent))
+    graph.add_node("retrieve_docs", timed("node.retrieve_docs")(retrieve_documents))
+    graph.add_node("generate_answer", timed("node.generate_answer")(generate_answer))
+    graph.add_node("policy_check", timed("node.policy_check")(policy_check))
 
     # Edges
-    graph.set_entry_point("classify_intent")
+    graph.set_entry_point("rewrite_query")
+    graph.add_edge("rewrite_query", "classify_intent")
     graph.add_edge("classify_intent", "retrieve_docs")
     graph.add_edge("retrieve_docs", "generate_answer")
     graph.add_edge("generate_answer", "policy_check")
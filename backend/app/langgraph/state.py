@@ -7,8 +7,18 @@ class RetrievedChunk(TypedDict, total=False):
     page: Optional[int]
 
 
+class ConversationTurn(TypedDict):
+    role: str  # "user" or "assistant"
+    content: str
+
+
 class HRState(TypedDict, total=False):
     question: str
+    conversation_id: Optional[str]
+    history: List[ConversationTurn]
+    history_summary: Optional[str]
+    previous_chunks: List[RetrievedChunk]
+    search_query: Optional[str]  # standalone rewrite of question used for retrieval
     topic: Optional[str]
     intent: Optional[str]
     retrieved_chunks: List[RetrievedChunk]
@@ -2,12 +2,17 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import get_settings
-from .routers import hr
+from .routers import admin, hr
 from .utils.logging import configure_logging
+from .utils.profiling import profiling_middleware
+from .utils.server import SERVER_ROLES
 
 settings = get_settings()
 configure_logging()
 
+if settings.SERVER_ROLE not in SERVER_ROLES:
+    raise ValueError(f"Unknown SERVER_ROLE {settings.SERVER_ROLE!r}, expected one of {SERVER_ROLES}")
+
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
@@ -22,10 +27,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.middleware("http")(profiling_middleware)
+
 # Routers
-app.include_router(hr.router, prefix="/api/v1/hr", tags=["HR Assistant"])
+if settings.SERVER_ROLE in ("all", "query"):
+    app.include_router(hr.query_router, prefix="/api/v1/hr", tags=["HR Assistant"])
+if settings.SERVER_ROLE in ("all", "ingest"):
+    app.include_router(hr.ingest_router, prefix="/api/v1/hr", tags=["HR Assistant"])
+# Admin endpoints expose captured questions and internals: off without a key.
+if settings.ADMIN_API_KEY:
+    app.include_router(admin.router, prefix="/api/v1/admin", tags=["Admin"])
 
 
 @app.get("/health", tags=["Health"])
 async def health_check():
-    return {"status": "ok", "env": settings.ENVIRONMENT}
+    return {"status": "ok", "env": settings.ENVIRONMENT, "role": settings.SERVER_ROLE}
@@ -0,0 +1,68 @@
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import PlainTextResponse
+
+from ..azure.openai_client import llm_usage_stats
+from ..config import get_settings
+from ..utils.hedging import hedging_stats
+from ..utils.profiling import get_profile, list_profiles
+
+settings = get_settings()
+
+
+def require_admin_key(x_admin_key: str | None = Header(default=None)):
+    # main.py only mounts this router when a key is configured; never fail open.
+    if not settings.ADMIN_API_KEY or not hmac.compare_digest(
+        x_admin_key or "", settings.ADMIN_API_KEY
+    ):
+        raise HTTPException(status_code=401, detail="Invalid admin key.")
+
+
+router = APIRouter(dependencies=[Depends(require_admin_key)])
+
+
+# Hedging and LLM stats are kept per worker process; X-Worker-Pid says which
+# worker answered.
+
+
+@router.get("/hedging")
+async def get_hedging_stats(response: Response):
+    """Hedge rate, wins, budget use, latency saved and observed latency quantiles per call type."""
+    response.headers["X-Worker-Pid"] = str(os.getpid())
+    return hedging_stats()
+
+
+@router.get("/llm")
+async def get_llm_usage(response: Response):
+    """Chat token totals, provider prompt-cache hit ratio and local response cache hits."""
+    response.headers["X-Worker-Pid"] = str(os.getpid())
+    return llm_usage_stats()
+
+
+@router.get("/profiles")
+def get_profiles():
+    """Captured slow or explicitly profiled requests, newest first."""
+    return list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile_detail(profile_id: str):
+    """Span timeline, per-span totals and cProfile summary of one captured request."""
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return profile
+
+
+@router.get("/profiles/{profile_id}/profile.txt", response_class=PlainTextResponse)
+def download_profile(profile_id: str):
+    """cProfile output of a captured request, sorted by cumulative time."""
+    profile = get_profile(profile_id)
+    if profile is None or profile["profile"] is None:
+        raise HTTPException(status_code=404, detail="No CPU profile for this request.")
+    return PlainTextResponse(
+        profile["profile"],
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.txt"'},
+    )
@@ -1,18 +1,54 @@
-from fastapi import APIRouter, File, HTTPException, UploadFile
+import contextvars
+import json
+import queue
+import shutil
+import tempfile
+import threading
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
 
-from ..azure.blob_client import upload_pdf_to_blob
-from ..ingestion.processor import ingest_pdf_bytes
+from fastapi import APIRouter, BackgroundTasks, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from ..config import get_settings
+from ..conversations.store import Conversation, compact_history, conversation_store, recent_turns
+from ..ingestion.archive import list_pdfs_in_zip
+from ..ingestion.processor import ingest_pdf_bytes, ingest_pdf_documents
 from ..langgraph.hr_graph import hr_assistant_app
 from ..langgraph.state import HRState
 from ..models.schemas import Citation, HRQueryRequest, HRQueryResponse
+from ..utils.profiling import annotate, cpu_profile, defer_finish, span
+
+settings = get_settings()
 
-router = APIRouter()
+# Mounted separately so /query and ingestion can run in different worker pools
+# (SERVER_ROLE).
+query_router = APIRouter()
+ingest_router = APIRouter()
 
+PDF_CONTENT_TYPES = ("application/pdf", "application/octet-stream")
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+
+
+@query_router.post("/query", response_model=HRQueryResponse)
+def query_hr_assistant(payload: HRQueryRequest, background_tasks: BackgroundTasks):
+    # A plain def: FastAPI runs it in its threadpool, so the blocking graph and
+    # store calls never hold up the worker's event loop.
+    conversation = conversation_store.get_or_create(
+        str(payload.conversation_id) if payload.conversation_id else None
+    )
+    annotate(question=payload.question, topic=payload.topic)
 
-@router.post("/query", response_model=HRQueryResponse)
-async def query_hr_assistant(payload: HRQueryRequest):
     initial_state: HRState = {
         "question": payload.question,
+        "conversation_id": conversation.id,
+        # Compaction runs after the response, so re-apply the budget here.
+        "history": recent_turns(
+            conversation.turns, settings.CONVERSATION_HISTORY_TOKEN_BUDGET
+        ),
+        "history_summary": conversation.summary,
+        "previous_chunks": conversation.last_chunks,
         "topic": payload.topic,
         "debug": payload.debug,
         "retrieved_chunks": [],
@@ -20,7 +56,8 @@ async def query_hr_assistant(payload: HRQueryRequest):
         "debug_info": {},
     }
 
-    final_state = hr_assistant_app.invoke(initial_state)
+    with cpu_profile(), span("graph.invoke"):
+        final_state = hr_assistant_app.invoke(initial_state)
 
     answer = final_state.get("answer", "")
     citations_raw = final_state.get("citations", [])
@@ -28,6 +65,15 @@ async def query_hr_assistant(payload: HRQueryRequest):
     intent = final_state.get("intent")
     debug_info = final_state.get("debug_info", {})
 
+    def record_turn(latest: Conversation) -> bool:
+        latest.turns.append({"role": "user", "content": payload.question})
+        latest.turns.append({"role": "assistant", "content": answer})
+        latest.last_chunks = citations_raw[: settings.CONVERSATION_REUSED_CHUNKS]
+        return True
+
+    conversation_store.update(conversation.id, record_turn)
+    background_tasks.add_task(compact_history, conversation.id)
+
     citations = [
         Citation(
             source=c.get("source", "unknown"),
@@ -43,15 +89,16 @@ async def query_hr_assistant(payload: HRQueryRequest):
         topic=topic,
         intent=intent,
         raw_context_count=len(citations_raw),
+        conversation_id=conversation.id,
         debug_info=debug_info if payload.debug else None,
     )
 
 
-@router.post("/upload")
+@ingest_router.post("/upload")
 async def upload_hr_document(file: UploadFile = File(...)):
     """Upload a single HR PDF, ingest into Azure Search. GitOps test."""
 
-    if file.content_type not in ("application/pdf", "application/octet-stream"):
+    if file.content_type not in PDF_CONTENT_TYPES:
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
     pdf_bytes = await file.read()
@@ -59,8 +106,13 @@ async def upload_hr_document(file: UploadFile = File(...)):
     if not pdf_bytes:
         raise HTTPException(status_code=400, detail="Empty file.")
 
-    blob_url = upload_pdf_to_blob(file.filename, pdf_bytes)
-    stats = ingest_pdf_bytes(pdf_bytes, file.filename)
+    annotate(files=[file.filename], bytes=len(pdf_bytes))
+
+    # Blocking SDK and CPU work runs off the event loop so /query stays responsive.
+    stats = await run_in_threadpool(ingest_pdf_bytes, pdf_bytes, file.filename)
+
+    if stats.get("status") == "error":
+        raise HTTPException(status_code=500, detail=stats.get("error"))
 
     return {
         "message": "Ingestion completed",
@@ -70,5 +122,117 @@ async def upload_hr_document(file: UploadFile = File(...)):
         "chunks": stats.get("chunks"),
         "failed": stats.get("failed"),
         "extraction_method": stats.get("extraction_method"),
-        "blob_url": blob_url,
+        "ocr_failed_pages": stats.get("ocr_failed_pages"),
+        "blob_url": stats.get("blob_url"),
+        "content_hash": stats.get("content_hash"),
+        "blob_cache_hit": stats.get("blob_cache_hit"),
+        "extraction_cache_hit": stats.get("extraction_cache_hit"),
+        "stages": stats.get("stages"),
     }
+
+
+def _spool_upload(file: UploadFile) -> BinaryIO:
+    # FastAPI closes UploadFiles when the handler returns, before a streamed
+    # response has finished, so ingestion reads from its own temp file.
+    spooled = tempfile.TemporaryFile()
+    file.file.seek(0)
+    shutil.copyfileobj(file.file, spooled)
+    spooled.seek(0)
+    return spooled
+
+
+def _stream_batch_ingestion(
+    documents: List[Tuple[str, Callable[[], bytes]]],
+    spooled: List[BinaryIO],
+    finish_profile: Optional[Callable[[], None]] = None,
+) -> Iterator[str]:
+    results: queue.Queue = queue.Queue()
+    # Zip archives are expanded by now, so clients can size their progress.
+    results.put({"files": len(documents)})
+
+    def run():
+        try:
+            summary = ingest_pdf_documents(documents, on_result=results.put)
+            results.put({"summary": {k: v for k, v in summary.items() if k != "files"}})
+        except Exception as exc:
+            logger.error(f"Batch ingestion failed: {exc}")
+            results.put({"summary": {"error": str(exc)}})
+        finally:
+            for f in spooled:
+                f.close()
+            if finish_profile is not None:
+                finish_profile()
+            results.put(None)
+
+    # The copied context keeps the request's profile, so the ingestion spans of
+    # a profiled batch land in its capture.
+    threading.Thread(
+        target=contextvars.copy_context().run, args=(run,), name="batch-ingestion", daemon=True
+    ).start()
+
+    while True:
+        item = results.get()
+        if item is None:
+            return
+        yield json.dumps(item) + "\n"
+
+
+@ingest_router.post("/upload/batch")
+async def upload_hr_documents(files: List[UploadFile] = File(...)):
+    """
+    Upload many HR PDFs and/or zip archives of PDFs, ingested concurrently.
+
+    Streams newline-delimited JSON: a {"files": N} line with the number of
+    PDFs (zip archives expanded), one line per file as soon as it is indexed,
+    then a final {"summary": ...} line.
+    """
+
+    documents: List[Tuple[str, Callable[[], bytes]]] = []
+    spooled: List[BinaryIO] = []
+
+    try:
+        for file in files:
+            is_zip = file.content_type in ZIP_CONTENT_TYPES or (
+                file.filename or ""
+            ).lower().endswith(".zip")
+            if not is_zip and file.content_type not in PDF_CONTENT_TYPES:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"{file.filename}: only PDF files and zip archives are supported.",
+                )
+            if not is_zip and file.size and file.size > settings.MAX_PDF_BYTES:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"{file.filename} is larger than {settings.MAX_PDF_BYTES} bytes.",
+                )
+
+            local = await run_in_threadpool(_spool_upload, file)
+            spooled.append(local)
+            if is_zip:
+                try:
+                    documents.extend(
+                        list_pdfs_in_zip(local, settings.MAX_BATCH_FILES, settings.MAX_PDF_BYTES)
+                    )
+                except ValueError as exc:
+                    raise HTTPException(status_code=400, detail=f"{file.filename}: {exc}")
+            else:
+                documents.append((file.filename, local.read))
+
+        if not documents:
+            raise HTTPException(status_code=400, detail="No PDF files found.")
+        if len(documents) > settings.MAX_BATCH_FILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{len(documents)} PDFs uploaded, the limit is {settings.MAX_BATCH_FILES}.",
+            )
+    except HTTPException:
+        for f in spooled:
+            f.close()
+        raise
+
+    annotate(files=[name for name, _ in documents])
+    return StreamingResponse(
+        # Ingestion outlives the handler, so the request profile ends with it.
+        _stream_batch_ingestion(documents, spooled, defer_finish()),
+        media_type="application/x-ndjson",
+    )
@@ -0,0 +1,195 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+from ..config import get_settings
+
+_settings = get_settings()
+
+# Callers run in FastAPI's threadpool (anyio's default limit of 40 threads).
+# Each of them can hold a primary and a hedge, so the pool never makes an
+# attempt queue behind other requests.
+_REQUEST_CONCURRENCY = 40
+_pool_size = max(_settings.HEDGE_MAX_WORKERS, 2 * _REQUEST_CONCURRENCY)
+_executor = ThreadPoolExecutor(max_workers=_pool_size, thread_name_prefix="hedge")
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+_hedgers: Dict[str, "Hedger"] = {}
+
+
+def _percentile(samples, q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Hedger:
+    """
+    Hedged requests for one kind of call: if the first attempt has not
+    answered after a delay (fixed, or the observed latency quantile), a
+    duplicate is fired and whichever finishes first wins. A per-minute budget
+    caps the extra load.
+
+    Threads cannot abort an in-flight HTTP call, so the loser is cancelled if
+    it has not started and otherwise left to finish with its result discarded.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._latencies: deque = deque(maxlen=500)
+        self._hedge_times: deque = deque()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_exhausted = 0
+        self.pool_busy = 0
+        self.latency_saved_seconds = 0.0
+        _hedgers[name] = self
+
+    def _record_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def delay_seconds(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is no data yet."""
+
+        if _settings.HEDGE_DELAY_MS is not None:
+            return _settings.HEDGE_DELAY_MS / 1000
+        with self._lock:
+            if len(self._latencies) < _settings.HEDGE_MIN_SAMPLES:
+                return None
+            delay = _percentile(self._latencies, _settings.HEDGE_DELAY_QUANTILE)
+        return max(delay, _settings.HEDGE_MIN_DELAY_MS / 1000)
+
+    def _take_budget(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._hedge_times and now - self._hedge_times[0] > 60:
+                self._hedge_times.popleft()
+            if len(self._hedge_times) >= _settings.HEDGE_BUDGET_PER_MINUTE:
+                self.budget_exhausted += 1
+                return False
+            self._hedge_times.append(now)
+            self.hedged += 1
+            return True
+
+    def _submit(self, fn: Callable, args, kwargs, record: bool = False) -> Future:
+        global _in_flight
+
+        ctx = contextvars.copy_context()
+
+        def run():
+            # Timed from when a thread picks the call up: queueing in the pool
+            # is not service latency and would inflate the hedge delay.
+            started = time.monotonic()
+            try:
+                return ctx.run(fn, *args, **kwargs)
+            finally:
+                if record:
+                    self._record_latency(time.monotonic() - started)
+
+        def release(_):
+            global _in_flight
+            with _in_flight_lock:
+                _in_flight -= 1
+
+        with _in_flight_lock:
+            _in_flight += 1
+        future = _executor.submit(run)
+        future.add_done_callback(release)
+        return future
+
+    def _pool_has_idle_thread(self) -> bool:
+        with _in_flight_lock:
+            idle = _in_flight < _pool_size
+        if not idle:
+            with self._lock:
+                self.pool_busy += 1
+        return idle
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        if not _settings.HEDGING_ENABLED:
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            self.calls += 1
+        started = time.monotonic()
+        primary = self._submit(fn, args, kwargs, record=True)
+
+        delay = self.delay_seconds()
+        if delay is None:
+            return primary.result()
+        try:
+            return primary.result(timeout=delay)
+        except FuturesTimeout:
+            pass
+
+        # A hedge that would only wait for a thread cannot beat the primary.
+        if not self._pool_has_idle_thread() or not self._take_budget():
+            return primary.result()
+
+        logger.debug(f"Hedging {self.name} call after {delay * 1000:.0f}ms")
+        hedge = self._submit(fn, args, kwargs)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is hedge:
+                        self._record_hedge_win(primary, time.monotonic() - started)
+                    return future.result()
+        # Both attempts failed; surface the original error.
+        return primary.result()
+
+    def _record_hedge_win(self, primary: Future, won_after: float) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+        started = time.monotonic() - won_after
+
+        def on_primary_done(_):
+            with self._lock:
+                self.latency_saved_seconds += max(0.0, time.monotonic() - started - won_after)
+
+        primary.add_done_callback(on_primary_done)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = list(self._latencies)
+            stats = {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "budget_exhausted": self.budget_exhausted,
+                "pool_busy": self.pool_busy,
+                "latency_saved_ms_total": round(self.latency_saved_seconds * 1000, 1),
+                "latency_saved_ms_per_win": (
+                    round(self.latency_saved_seconds * 1000 / self.hedge_wins, 1)
+                    if self.hedge_wins
+                    else None
+                ),
+            }
+        delay = self.delay_seconds()
+        stats["current_delay_ms"] = round(delay * 1000, 1) if delay is not None else None
+        for label, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            value = _percentile(latencies, q)
+            stats[label] = round(value * 1000, 1) if value is not None else None
+        return stats
+
+
+def hedging_stats() -> Dict:
+    return {
+        "enabled": _settings.HEDGING_ENABLED,
+        "budget_per_minute": _settings.HEDGE_BUDGET_PER_MINUTE,
+        "calls": {name: hedger.stats() for name, hedger in _hedgers.items()},
+    }
@@ -0,0 +1,339 @@
+import contextvars
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+
+from ..config import get_settings
+
+_settings = get_settings()
+
+MAX_SPANS_PER_REQUEST = 1000
+
+
+@dataclass
+class RequestProfile:
+    """Timings for one request; cProfile data only when the request is sampled."""
+
+    method: str
+    path: str
+    cpu_profile: bool
+    forced: bool = False
+    deferred: bool = False  # finished by the callback from defer_finish()
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    captured_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    duration_ms: float = 0.0
+    status_code: Optional[int] = None
+    annotations: Dict[str, Any] = field(default_factory=dict)
+    spans: List[Dict] = field(default_factory=list)
+    dropped_spans: int = 0
+    profile_text: Optional[str] = None
+    _started: float = field(default_factory=time.perf_counter)
+    _profilers: List[cProfile.Profile] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add_span(self, name: str, started: float, ended: float) -> None:
+        with self._lock:
+            if len(self.spans) >= MAX_SPANS_PER_REQUEST:
+                self.dropped_spans += 1
+                return
+            self.spans.append({
+                "name": name,
+                "start_ms": round((started - self._started) * 1000, 2),
+                "duration_ms": round((ended - started) * 1000, 2),
+                "thread": threading.current_thread().name,
+            })
+
+    def span_totals(self) -> Dict[str, Dict]:
+        totals: Dict[str, Dict] = {}
+        for s in self.spans:
+            entry = totals.setdefault(s["name"], {"count": 0, "total_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] = round(entry["total_ms"] + s["duration_ms"], 2)
+        return dict(sorted(totals.items(), key=lambda kv: -kv[1]["total_ms"]))
+
+    def finish(self, status_code: int) -> None:
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 2)
+        self.status_code = status_code
+        with self._lock:
+            profilers, self._profilers = self._profilers, []
+        if profilers:
+            out = io.StringIO()
+            stats = pstats.Stats(profilers[0], stream=out)
+            for profiler in profilers[1:]:
+                stats.add(profiler)
+            stats.sort_stats("cumulative").print_stats(_settings.PROFILE_TOP_FUNCTIONS)
+            self.profile_text = out.getvalue()
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "captured_at": self.captured_at,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "duration_ms": self.duration_ms,
+            "forced": self.forced,
+            "question": self.annotations.get("question"),
+            "has_cpu_profile": self.profile_text is not None,
+        }
+
+    def as_dict(self) -> Dict:
+        return {
+            **self.summary(),
+            "annotations": self.annotations,
+            "span_totals": self.span_totals(),
+            "spans": self.spans,
+            "dropped_spans": self.dropped_spans,
+            "profile": self.profile_text,
+        }
+
+
+_current: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+# Captures are stored as profiles/{id}.json blobs, shared by every worker,
+# replica and deployment (query and ingest pods), so the admin endpoints find
+# any of them. Without blob storage (local development) they are files in
+# PROFILE_DIR, shared by the workers of one process tree.
+_PROFILE_PREFIX = "profiles/"
+_profile_dir = Path(_settings.PROFILE_DIR)
+_PROFILE_ID = re.compile(r"^[0-9a-f]{12}$")
+_DETAIL_KEYS = ("annotations", "span_totals", "spans", "dropped_spans", "profile")
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block under the current request's profile; no-op outside requests."""
+
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_span(name, started, time.perf_counter())
+
+
+def timed(name: str) -> Callable:
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def cpu_profile() -> Iterator[None]:
+    """Run cProfile on this thread for the block if the current request is sampled."""
+
+    profile = _current.get()
+    if profile is None or not profile.cpu_profile:
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as exc:  # another profiler is active on this thread
+        logger.debug(f"cProfile not started: {exc}")
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        with profile._lock:
+            profile._profilers.append(profiler)
+
+
+def annotate(**values: Any) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.annotations.update(values)
+
+
+def _blobs():
+    """The blob client module when blob storage is configured, else None."""
+
+    # Imported here: blob_client times its calls with span() from this module.
+    from ..azure import blob_client
+
+    return blob_client if blob_client.blob_storage_enabled() else None
+
+
+def _read_file(path: Path) -> Optional[Dict]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):  # pruned by another worker meanwhile
+        return None
+
+
+def _profile_files() -> List[Path]:
+    """Captured profiles in PROFILE_DIR, newest first."""
+
+    def mtime(path: Path) -> float:
+        try:
+            return path.stat().st_mtime
+        except OSError:
+            return 0.0
+
+    return sorted(_profile_dir.glob("*.json"), key=mtime, reverse=True)
+
+
+def _store(profile: RequestProfile) -> None:
+    """Save a capture and prune all but the newest PROFILE_RING_SIZE."""
+
+    blobs = _blobs()
+    if blobs is not None:
+        name = f"{_PROFILE_PREFIX}{profile.id}.json"
+        if not blobs.upload_json_to_blob(name, profile.as_dict()):
+            raise RuntimeError(f"upload of {name} failed")
+        for old in blobs.list_blob_names_newest_first(_PROFILE_PREFIX)[_settings.PROFILE_RING_SIZE:]:
+            blobs.delete_blob(old)
+        return
+
+    _profile_dir.mkdir(parents=True, exist_ok=True)
+    path = _profile_dir / f"{profile.id}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(profile.as_dict()))
+    os.replace(tmp, path)  # readers never see a partial file
+    for old in _profile_files()[_settings.PROFILE_RING_SIZE:]:
+        old.unlink(missing_ok=True)
+
+
+def _load(profile_id: str) -> Optional[Dict]:
+    blobs = _blobs()
+    if blobs is None:
+        return _read_file(_profile_dir / f"{profile_id}.json")
+    payload, _ = blobs.download_json_with_etag(f"{_PROFILE_PREFIX}{profile_id}.json")
+    return payload
+
+
+def list_profiles() -> List[Dict]:
+    blobs = _blobs()
+    if blobs is None:
+        ids = [path.stem for path in _profile_files()]
+    else:
+        ids = [
+            name[len(_PROFILE_PREFIX):].removesuffix(".json")
+            for name in blobs.list_blob_names_newest_first(_PROFILE_PREFIX)
+        ]
+    summaries = []
+    for profile_id in ids:
+        data = _load(profile_id)
+        if data is not None:  # pruned meanwhile
+            summaries.append({k: v for k, v in data.items() if k not in _DETAIL_KEYS})
+    return summaries
+
+
+def get_profile(profile_id: str) -> Optional[Dict]:
+    """RequestProfile.as_dict() of a captured request, or None."""
+
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    return _load(profile_id)
+
+
+def _should_keep(profile: RequestProfile) -> bool:
+    return profile.forced or profile.duration_ms >= _settings.SLOW_REQUEST_THRESHOLD_MS
+
+
+def _keep(profile: RequestProfile) -> bool:
+    """Store a finished profile. Returns True if stored."""
+
+    try:
+        _store(profile)
+    except Exception as exc:
+        logger.error(f"Failed to store profile {profile.id}: {exc}")
+        return False
+    logger.info(
+        f"Captured profile {profile.id} for {profile.method} {profile.path} "
+        f"({profile.duration_ms:.0f}ms)"
+    )
+    return True
+
+
+def defer_finish() -> Optional[Callable[[], None]]:
+    """
+    For streamed responses whose work runs after the handler returns: the
+    current request's profile is finished and captured when the returned
+    callback is called, instead of when the response starts.
+    """
+
+    profile = _current.get()
+    if profile is None:
+        return None
+    profile.deferred = True
+
+    def finish() -> None:
+        profile.finish(profile.status_code or 200)
+        if _should_keep(profile):
+            _keep(profile)
+
+    return finish
+
+
+def _is_forced(header_value: Optional[str]) -> bool:
+    # Only admins can force a profile; without an admin key the header is ignored.
+    if not header_value or not _settings.ADMIN_API_KEY:
+        return False
+    return hmac.compare_digest(header_value, _settings.ADMIN_API_KEY)
+
+
+async def profiling_middleware(request, call_next):
+    """
+    Every request records span timings. A sampled fraction (PROFILE_SAMPLE_RATE),
+    or requests with the profile header, also run cProfile. Requests slower than
+    SLOW_REQUEST_THRESHOLD_MS, or with the header, are stored (see _store) and
+    served by /api/v1/admin/profiles.
+    """
+
+    if not _settings.PROFILING_ENABLED or request.url.path.startswith("/api/v1/admin"):
+        return await call_next(request)
+
+    forced = _is_forced(request.headers.get(_settings.PROFILE_HEADER))
+    profile = RequestProfile(
+        method=request.method,
+        path=request.url.path,
+        cpu_profile=forced or random.random() < _settings.PROFILE_SAMPLE_RATE,
+        forced=forced,
+    )
+    token = _current.set(profile)
+    try:
+        response = await call_next(request)
+    finally:
+        _current.reset(token)
+
+    profile.status_code = response.status_code
+    if profile.deferred:
+        # Only forced profiles are known to be captured before the body is sent.
+        if forced:
+            response.headers["X-Profile-Id"] = profile.id
+    else:
+        profile.finish(response.status_code)
+        # Storing is blocking blob I/O, so it runs off the event loop.
+        if _should_keep(profile) and await run_in_threadpool(_keep, profile):
+            response.headers["X-Profile-Id"] = profile.id
+    return response
@@ -0,0 +1,54 @@
+import math
+import os
+from pathlib import Path
+from typing import Optional
+
+SERVER_ROLES = ("all", "query", "ingest")
+
+_CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def _cgroup_cpu_quota() -> Optional[float]:
+    """CPU limit of the container in cores, or None when unlimited."""
+
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        quota, period = (_CGROUP_ROOT / "cpu.max").read_text().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: quota is -1 when unlimited
+        quota = int((_CGROUP_ROOT / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((_CGROUP_ROOT / "cpu" / "cpu.cfs_period_us").read_text())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    """Cores this process may use: the CPU affinity mask, capped by the cgroup quota."""
+
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def default_worker_count(role: str, cpus: int, max_workers: int) -> int:
+    """
+    One worker per core for every role. Handlers run their blocking calls in
+    the worker's threadpool, so a worker overlaps many requests waiting on
+    OpenAI, Search or Document Intelligence on its own. What extra processes
+    buy is parallel Python CPU work (pypdf, chunking, graph overhead) past the
+    GIL, which stops paying off beyond the cores available. Capped at
+    max_workers to bound memory.
+    """
+
+    if role not in SERVER_ROLES:
+        raise ValueError(f"Unknown SERVER_ROLE {role!r}, expected one of {SERVER_ROLES}")
+    return max(1, min(cpus, max_workers))
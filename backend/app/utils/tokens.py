@@ -0,0 +1,20 @@
+from typing import List
+
+import tiktoken
+
+_encoder = tiktoken.encoding_for_model("gpt-4o")
+
+
+def get_encoder() -> tiktoken.Encoding:
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    return len(_encoder.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    tokens: List[int] = _encoder.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return _encoder.decode(tokens[:max_tokens])
@@ -0,0 +1,194 @@
+"""
+Throughput of the gunicorn server mode for a growing number of workers.
+
+    cd backend && python -m benchmarks.bench_workers --workers 1 2 4 8
+
+Each run starts gunicorn with gunicorn.conf.py, which means preload plus uvicorn
+workers, and serves the small app below. /work is a plain def handler like
+/query, so FastAPI runs it in the worker's threadpool. Per request it does:
+- CPU: tiktoken encoding of --cpu-tokens tokens with the app's shared encoder.
+- CPU: --py-cpu-ms of pure-Python work holding the GIL, standing in for pypdf,
+  chunking and graph overhead. Only more processes scale this part.
+- I/O: a blocking --io-ms wait, standing in for OpenAI and Search latency.
+  It overlaps across requests within one worker.
+
+With --blocking the handler is async def instead, so it blocks the event loop
+and each worker serves one request at a time. That is how /query behaved
+before it became a def handler.
+
+The script reports requests/s, p50/p95 latency and the speedup over the first
+run. It needs no Azure credentials.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+from fastapi import FastAPI
+
+from app.utils.server import available_cpus
+from app.utils.tokens import get_encoder
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# gunicorn.conf.py loads the settings, which require these.
+_PLACEHOLDER_ENV = {
+    "OPENAI_API_KEY": "bench",
+    "AZURE_OPENAI_ENDPOINT": "https://bench.invalid",
+    "AZURE_OPENAI_API_KEY": "bench",
+    "AZURE_OPENAI_CHAT_DEPLOYMENT": "bench",
+    "AZURE_OPENAI_EMBEDDING_DEPLOYMENT": "bench",
+    "AZURE_SEARCH_ENDPOINT": "https://bench.invalid",
+    "AZURE_SEARCH_API_KEY": "bench",
+    "AZURE_SEARCH_INDEX_NAME": "bench",
+}
+
+_encoder = get_encoder()
+_TEXT = "Employees accrue 2.5 days of paid leave per month of service. " * 4000
+
+bench_app = FastAPI()
+
+
+@bench_app.get("/ping")
+async def ping():
+    return {"pid": os.getpid()}
+
+
+def _work(cpu_tokens: int, py_cpu_ms: int, io_ms: int) -> Dict:
+    tokens = _encoder.encode(_TEXT[: cpu_tokens * 4])
+    deadline = time.thread_time() + py_cpu_ms / 1000
+    while time.thread_time() < deadline:
+        sum(range(1000))
+    time.sleep(io_ms / 1000)
+    return {"pid": os.getpid(), "tokens": len(tokens)}
+
+
+@bench_app.post("/work")
+def work(cpu_tokens: int = 20000, py_cpu_ms: int = 5, io_ms: int = 50):
+    return _work(cpu_tokens, py_cpu_ms, io_ms)
+
+
+@bench_app.post("/work-blocking")
+async def work_blocking(cpu_tokens: int = 20000, py_cpu_ms: int = 5, io_ms: int = 50):
+    return _work(cpu_tokens, py_cpu_ms, io_ms)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(workers: int, port: int) -> subprocess.Popen:
+    env = {**_PLACEHOLDER_ENV, **os.environ, "WEB_CONCURRENCY": str(workers)}
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "benchmarks.bench_workers:bench_app",
+            "-c", "gunicorn.conf.py",
+            "--bind", f"127.0.0.1:{port}",
+            "--log-level", "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+
+
+def _wait_ready(base_url: str, workers: int, timeout: float = 60.0) -> None:
+    # Ready once every worker has answered at least once.
+    deadline = time.monotonic() + timeout
+    pids = set()
+    while time.monotonic() < deadline:
+        try:
+            pids.add(httpx.get(f"{base_url}/ping", timeout=1).json()["pid"])
+            if len(pids) >= workers:
+                return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    if not pids:
+        raise RuntimeError(f"server at {base_url} did not start")
+
+
+async def _load(
+    base_url: str, path: str, concurrency: int, duration: float, params: Dict
+) -> List[float]:
+    latencies: List[float] = []
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def user():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                resp = await client.post(path, params=params)
+                resp.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    return latencies
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(workers: int, path: str, concurrency: int, duration: float, params: Dict) -> Dict:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = _start_server(workers, port)
+    try:
+        _wait_ready(base_url, workers)
+        asyncio.run(_load(base_url, path, concurrency, 1.0, params))  # warm-up
+        latencies = asyncio.run(_load(base_url, path, concurrency, duration, params))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "rps": len(latencies) / duration,
+        "p50_ms": _percentile(latencies, 0.5) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent client connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--cpu-tokens", type=int, default=20000, help="tokens encoded per request")
+    parser.add_argument("--py-cpu-ms", type=int, default=5, help="GIL-bound CPU time per request")
+    parser.add_argument("--io-ms", type=int, default=50, help="blocking wait per request")
+    parser.add_argument("--blocking", action="store_true", help="async handler that blocks the event loop")
+    args = parser.parse_args(argv)
+
+    path = "/work-blocking" if args.blocking else "/work"
+    params = {"cpu_tokens": args.cpu_tokens, "py_cpu_ms": args.py_cpu_ms, "io_ms": args.io_ms}
+    print(
+        f"{available_cpus()} CPUs, {path}, concurrency {args.concurrency}, "
+        f"{args.duration:.0f}s per run, {params}"
+    )
+    print(f"{'workers':>7} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8}")
+
+    baseline = None
+    for workers in args.workers:
+        result = run(workers, path, args.concurrency, args.duration, params)
+        baseline = baseline or result["rps"]
+        print(
+            f"{result['workers']:>7} {result['requests']:>9} {result['rps']:>8.1f} "
+            f"{result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} {result['rps'] / baseline:>7.2f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""
+Production server: gunicorn master preloads app.main, then forks uvicorn workers.
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+Everything built at import time (settings, the tiktoken BPE tables, the compiled
+LangGraph app, client objects) is created once in the master and shared with the
+workers copy-on-write. Network connections are only opened on first use, so
+each worker still gets its own connection pools.
+
+Set SERVER_ROLE=query or SERVER_ROLE=ingest to serve only /query or only the
+upload endpoints. The worker count is sized from the cores the container may use
+(cgroup quota and CPU affinity); WEB_CONCURRENCY overrides it.
+"""
+
+import gc
+
+from app.config import get_settings
+from app.utils.server import available_cpus, default_worker_count
+
+_settings = get_settings()
+
+bind = "0.0.0.0:8000"
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+workers = _settings.WEB_CONCURRENCY or default_worker_count(
+    _settings.SERVER_ROLE, available_cpus(), _settings.SERVER_MAX_WORKERS
+)
+timeout = _settings.SERVER_WORKER_TIMEOUT
+graceful_timeout = 30
+keepalive = 5
+accesslog = None  # requests are logged by the app
+
+
+def when_ready(server):
+    server.log.info(
+        f"SERVER_ROLE={_settings.SERVER_ROLE}: starting {workers} workers "
+        f"({available_cpus()} CPUs available)"
+    )
+    # The preloaded app is done allocating: move its objects out of the
+    # collector's reach so collections in the workers never write to (and
+    # un-share) those pages.
+    gc.freeze()
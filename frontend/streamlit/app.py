@@ -1,10 +1,19 @@
+import json
 import os
 
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
-from components.chat import add_message, init_chat, render_chat_history
+from components.chat import (
+    add_message,
+    get_conversation_id,
+    init_chat,
+    render_chat_history,
+    reset_chat,
+    set_conversation_id,
+)
 from components.citations import render_citations
 from components.header import render_header
 
@@ -15,6 +24,20 @@ BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000/api/v1/hr/query")
 BACKEND_UPLOAD_URL = os.getenv(
     "BACKEND_UPLOAD_URL", "http://localhost:8000/api/v1/hr/upload"
 )
+BACKEND_BATCH_UPLOAD_URL = os.getenv(
+    "BACKEND_BATCH_UPLOAD_URL", f"{BACKEND_UPLOAD_URL.rstrip('/')}/batch"
+)
+
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """One pooled, keep-alive session shared by all reruns and users."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 
 st.set_page_config(
     page_title="HR Assistant AI",
@@ -34,34 +57,67 @@ with st.sidebar:
     st.header("📁 Upload HR Documents")
 
     uploaded_files = st.file_uploader(
-        "Upload HR policy PDFs",
-        type=["pdf"],
+        "Upload HR policy PDFs (or zip archives of PDFs)",
+        type=["pdf", "zip"],
         accept_multiple_files=True,
     )
 
     if uploaded_files:
         if st.button("Ingest documents"):
+            files = [
+                (
+                    "files",
+                    (
+                        f.name,
+                        f.getvalue(),
+                        "application/zip" if f.name.lower().endswith(".zip") else "application/pdf",
+                    ),
+                )
+                for f in uploaded_files
+                if f.size
+            ]
+            # Zip archives expand on the backend, which sends the PDF count first.
+            total = None
+            progress = st.progress(0.0, text=f"Ingesting {len(files)} files...")
             results = []
-            for f in uploaded_files:
-                try:
-                    file_bytes = f.read()
-                    f.seek(0)
-                    if not file_bytes:
-                        continue
-                    with st.spinner(f"Ingesting {f.name}..."):
-                        files = {"file": (f.name, file_bytes, "application/pdf")}
-                        resp = requests.post(
-                            BACKEND_UPLOAD_URL, files=files, timeout=120
-                        )
-                        resp.raise_for_status()
-                        results.append(resp.json())
-                except Exception as e:
-                    st.error(f"Error ingesting {f.name}: {e}")
+            summary = {}
+            try:
+                with get_http_session().post(
+                    BACKEND_BATCH_UPLOAD_URL, files=files, stream=True, timeout=(10, 600)
+                ) as resp:
+                    resp.raise_for_status()
+                    for line in resp.iter_lines():
+                        if not line:
+                            continue
+                        item = json.loads(line)
+                        if "files" in item:
+                            total = item["files"]
+                            progress.progress(0.0, text=f"Ingesting {total} PDFs...")
+                            continue
+                        if "summary" in item:
+                            summary = item["summary"]
+                            continue
+                        results.append(item)
+                        label = f"{item.get('file')}: {item.get('status')} ({len(results)} done)"
+                        if item.get("status") == "error":
+                            st.error(f"Error ingesting {item.get('file')}: {item.get('error')}")
+                        fraction = min(len(results) / total, 1.0) if total else 0.0
+                        progress.progress(fraction, text=label)
+            except Exception as e:
+                st.error(f"Error ingesting documents: {e}")
+            if summary.get("error"):
+                st.error(f"Ingestion failed: {summary['error']}")
             if results:
-                st.success("Ingestion completed.")
+                progress.progress(1.0, text=f"{len(results)} files processed")
+                st.success(
+                    f"Ingestion completed: {summary.get('succeeded', 0)}/{summary.get('total', len(results))} files OK."
+                )
                 st.json(results)
 
     st.markdown("---")
+    if st.button("🗨️ New conversation"):
+        reset_chat()
+
     st.header("📚 Sources")
     citations = st.session_state.get("latest_citations", [])
     render_citations(citations)
@@ -76,6 +132,7 @@ if user_input:
 
     payload = {
         "question": user_input,
+        "conversation_id": get_conversation_id(),
         "topic": None,
         "debug": False,
     }
@@ -83,7 +140,7 @@ if user_input:
     # Call backend
     try:
         with st.spinner("Thinking..."):
-            response = requests.post(BACKEND_URL, json=payload, timeout=30)
+            response = get_http_session().post(BACKEND_URL, json=payload, timeout=30)
             response.raise_for_status()
             data = response.json()
 
@@ -91,6 +148,8 @@ if user_input:
             citations = data.get("citations", [])
 
             add_message("assistant", answer)
+            if data.get("conversation_id"):
+                set_conversation_id(data["conversation_id"])
 
             # Store citations for sidebar display
             st.session_state["latest_citations"] = citations
@@ -1,9 +1,27 @@
+import uuid
+
 import streamlit as st
 
 
 def init_chat():
     if "messages" not in st.session_state:
         st.session_state["messages"] = []
+    if "conversation_id" not in st.session_state:
+        st.session_state["conversation_id"] = str(uuid.uuid4())
+
+
+def get_conversation_id() -> str:
+    return st.session_state["conversation_id"]
+
+
+def set_conversation_id(conversation_id: str):
+    st.session_state["conversation_id"] = conversation_id
+
+
+def reset_chat():
+    st.session_state["messages"] = []
+    st.session_state["conversation_id"] = str(uuid.uuid4())
+    st.session_state["latest_citations"] = []
 
 
 def add_message(role: str, content: str):